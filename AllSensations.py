@@ -1,22 +1,27 @@
 import pyvista as pv
-import numpy as np
-import vtk
 import os
+import sys
 from datetime import datetime
+from brush import CellBrush
+from paint_engine import PaintEngine
+from stroke_pipeline import StrokePipeline
+from picking import CellIdPicker, build_cell_picker
+from lod import LodPicker, LodView
+from toolbar import Toolbar
+from session import save_session, load_session, session_state
+from mesh_cache import load_mesh
+from background_writer import BackgroundWriter, write_png
+from report import ReportRenderer
+from glb_export import write_session_glb
+from face_export import write_painted_faces
 
 # Load the 3D model
-mesh = pv.read("human_foot.obj")
+mesh_file = "human_foot.obj"
+mesh, mesh_data = load_mesh(mesh_file)  # binary cache, parsed only on first load
 
 # Start PyVista plotter
 plotter = pv.Plotter()
 
-# Initialize colors array for each face (cell)
-colors = np.ones((mesh.n_cells, 3)) * 0.8  # Set initial gray color for each face
-mesh.cell_data["face_colors"] = colors
-
-# Add the mesh to the plotter, specifying cell scalars for face coloring
-plotter.add_mesh(mesh, scalars="face_colors", rgb=True)
-
 # Track drawing mode and current sensation
 drawing_mode = [False]
 current_sensation = ["none"]
@@ -30,56 +35,53 @@ sensation_colors = {
     "vibration":   [0.0, 1.0, 0.0],  # Green
 }
 
-# PyVista Picker for selecting cells
-picker = vtk.vtkCellPicker()
-picker.SetTolerance(0.01)
-
-# Get window dimensions
-window_width = plotter.window_size[0]
-window_height = plotter.window_size[1]
+# Per-cell sensation state; each cell stores a palette index that is mapped to
+# its display color through a lookup table built from sensation_colors
+# Painted area per sensation is tracked in cm²; human_foot.obj is modelled in decimeters
+cm_per_unit = 10.0
+painter = PaintEngine(plotter, mesh, sensation_colors, areas=mesh_data["areas"], area_scale=cm_per_unit ** 2)
+
+# Continue a saved session if one is given on the command line; sessions
+# painted on a different mesh are rejected
+mesh_hash = mesh_data["fingerprint"]
+if len(sys.argv) > 1:
+    painter.load_state(session_state(load_session(sys.argv[1], mesh_hash), sensation_colors, painter.state.dtype), render=False)
+
+# Add the mesh to the plotter, coloring faces by their palette index
+foot_actor = plotter.add_mesh(mesh, scalars="sensation_state", cmap=painter.lookup_table, show_scalar_bar=False)
+
+# Level of detail: on dense scans (lod_min_cells and up) a decimated proxy is
+# drawn while the camera moves or paint lands, and the full mesh comes back
+# after lod_idle_delay seconds without input. Paint always goes to the full mesh.
+lod_min_cells = 500_000
+lod_idle_delay = 0.3
+lod = LodView(plotter, painter, foot_actor, min_cells=lod_min_cells, idle_delay=lod_idle_delay)
+
+# Picker for selecting cells. The cell-ID buffer picker looks cells up in an
+# offscreen id image that is only re-rendered when the camera moves.
+# Otherwise a vtkCellPicker with a static cell locator built once here.
+use_cell_id_buffer = True
+if use_cell_id_buffer:
+    picker = CellIdPicker(mesh)
+else:
+    picker = LodPicker(build_cell_picker(foot_actor, locator="static"), lod)
+
+# Brush painting: every cell centroid within brush_radius of the pick is painted
+# (radius 0 paints only the picked cell). The centroid KD-tree is built once here.
+# Radius and [ ] step are given in cm and converted to mesh units.
+brush_radius = 0.5 / cm_per_unit
+brush_step = 0.1 / cm_per_unit
+brush = CellBrush(mesh, radius=brush_radius, centroids=mesh_data["centroids"])
+
+# Clicks are queued and painted on a timer, rendering at most target_fps times a second
+target_fps = 60
+stroke = StrokePipeline(plotter, picker, brush, painter, current_sensation, target_fps=target_fps)
 
 plotter.iren.interactor_style = None  # Lock camera rotation
 
-# Function to update button display
+# Function to update button display (only restyles the existing toolbar actors)
 def update_buttons(active):
-    # Remove old buttons (by name)
-    for name in list(plotter.actors.keys()):
-        if name.endswith("_button"):
-            plotter.remove_actor(name)
-
-    y_offset = 10
-    spacing = 40
-    for i, (sensation, color) in enumerate(sensation_colors.items()):
-        label = sensation.upper() if active == sensation else sensation.capitalize()
-        shadow = True if active == sensation else False
-        plotter.add_text(
-            label,
-            position=(window_width - 150, y_offset + i * spacing),
-            font_size=16,
-            color=color,
-            name=f"{sensation}_button",
-            shadow=shadow
-        )
-
-    # Add Stop, Save, Lock, Unlock, Quit buttons
-    extra_buttons = [
-        ("Stop", "black", "stop_button"),
-        ("Save", "green", "save_button"),
-        ("Lock", "black", "lock_button"),
-        ("Unlock", "black", "unlock_button"),
-        ("Quit", "red", "quit_button"),
-    ]
-    for j, (label, color, name) in enumerate(extra_buttons):
-        pos_y = y_offset + (len(sensation_colors) + j) * spacing
-        highlight = (active.lower() == label.lower())
-        plotter.add_text(
-            label.upper() if highlight else label,
-            position=(window_width - 150, pos_y),
-            font_size=16,
-            color=color,
-            name=name,
-            shadow=highlight
-        )
+    toolbar.set_active(active)
 
 # Sensation mode setter
 def set_sensation_mode(sensation):
@@ -112,17 +114,69 @@ def save_image():
     timeText = now.strftime("%Y%m%d-%H%M%S")
     plotter.enable()
     save_dir = os.path.join(os.getcwd(), "Foot Maps")
-    os.makedirs(save_dir, exist_ok=True)
     save_path = os.path.join(save_dir, f"footMap_{timeText}.png")
-    plotter.screenshot(save_path)
-    print(f"Image saved at: {save_path}")
+    # Only grab the framebuffer here; PNG encoding and writing happen in the background
+    image = plotter.screenshot(None, return_img=True)
+    writer.submit(save_path, write_png, image)
     update_buttons("save")
     plotter.render()
 
+# Save dorsal, plantar, medial and lateral views in one image. The views are
+# rendered offscreen from the same mesh and state; the renderer is built on first use.
+report_renderer = [None]
+def save_report():
+    if report_renderer[0] is None:
+        report_renderer[0] = ReportRenderer(mesh, painter.lookup_table)
+    timeText = datetime.now().strftime("%Y%m%d-%H%M%S")
+    save_dir = os.path.join(os.getcwd(), "Foot Maps")
+    save_path = os.path.join(save_dir, f"footReport_{timeText}.png")
+    writer.submit(save_path, write_png, report_renderer[0].render())
+
+# Save the painted cells as a new session file (the base mesh is referenced by its hash)
+def save_current_session():
+    timeText = datetime.now().strftime("%Y%m%d-%H%M%S")
+    save_dir = os.path.join(os.getcwd(), "Sessions")
+    save_path = os.path.join(save_dir, f"session_{timeText}.npz")
+    writer.submit(save_path, save_session, painter.state.copy(), dict(sensation_colors), mesh_hash, mesh_file=mesh_file,
+                  areas_cm2=painter.area_totals(), cm_per_unit=cm_per_unit)
+
+# Export the painted mesh as binary glTF for lightweight viewers
+def export_glb():
+    timeText = datetime.now().strftime("%Y%m%d-%H%M%S")
+    save_dir = os.path.join(os.getcwd(), "Foot Maps")
+    save_path = os.path.join(save_dir, f"footMesh_{timeText}.glb")
+    writer.submit(save_path, write_session_glb, mesh, painter.state.copy(), dict(sensation_colors))
+
+# Export only the painted faces as an indexed mesh for matlab_plotting.m
+def export_matlab():
+    timeText = datetime.now().strftime("%Y%m%d-%H%M%S")
+    save_dir = os.path.join(os.getcwd(), "Foot Maps")
+    save_path = os.path.join(save_dir, f"paintedFaces_{timeText}.mat")
+    state = painter.state.copy()
+    colors = painter.palette[state]
+    writer.submit(save_path, lambda path: write_painted_faces(mesh, colors, path, painted=state != 0))
+
+# Painted area readout (upper left), refreshed from the running totals on every paint.
+# area_text is a vtkCornerAnnotation (what add_text returns for a corner position)
+def update_area_readout(cells=None):
+    lines = [f"{sensation.capitalize()}: {area:.1f} cm²" for sensation, area in painter.area_totals().items()]
+    area_text.SetText(2, "\n".join(lines))  # corner 2 is the upper left
+
+# Report finished background saves (checked on every timer tick)
+def report_saves(*args):
+    for path, error in writer.poll():
+        message = f"Save failed: {path} ({error})" if error else f"Saved at: {path}"
+        print(message)
+        status_text.SetInput(message)
+        plotter.render()
+
 # Quit the application
 def quit_application():
+    save_current_session()
     update_buttons("quit")
     plotter.render()
+    writer.close()  # let pending saves finish
+    report_saves()
     plotter.close()
 
 # Drawing on the foot model
@@ -144,58 +198,17 @@ def draw_on_foot(*args):
     if not drawing_mode[0]:
         return
 
+    # Each click is its own stroke
     x, y = plotter.iren.get_event_position()
-    picker.Pick(x, y, 0, plotter.renderer)
-    picked_cell_id = picker.GetCellId()
-
-    if picked_cell_id >= 0 and current_sensation[0] in sensation_colors:
-        new_color = np.array(sensation_colors[current_sensation[0]])
-        current_color = colors[picked_cell_id]
-
-        # If current color is not the default gray, average with new color
-        if not np.allclose(current_color, [0.8, 0.8, 0.8]):
-            blended_color = (current_color + new_color) / 2
-            colors[picked_cell_id] = blended_color
-            print(f"Blended color {current_color} and {new_color} -> {blended_color}")
-
-            if np.allclose(current_color, [1.0, 0.0, 0.0]) and np.allclose(new_color, [0.0, 0.0, 1.0]):
-                print("The color produced by averaging red and blue in digital systems is typically magenta or a purplish-red hue.")
-        else:
-            colors[picked_cell_id] = new_color
-
-        # ⚠️ Force mesh update by reassigning a new copy of the array
-        mesh.cell_data["face_colors"] = colors.copy()
-
-        # ⚠️ Refresh the color mapping with updated array
-        plotter.update_scalars(colors.copy(), render=True)
+    stroke.begin_stroke()
+    stroke.add_event(x, y)
 
 # Handle button clicks
 
 def handle_mouse_click(*args):
     x, y = plotter.iren.get_event_position()
-    
-    y_offset = 10
-    spacing = 40
-
-    for i, sensation in enumerate(sensation_colors):
-        if window_width - 150 <= x <= window_width - 50 and y_offset + i * spacing <= y <= y_offset + i * spacing + 25:
-            set_sensation_mode(sensation)
-            return
-
-    extra_actions = [
-        ("stop", stop_drawing),
-        ("save", save_image),
-        ("lock", set_screen_lock_mode),
-        ("unlock", set_screen_unlock_mode),
-        ("quit", quit_application),
-    ]
-
-    for j, (label, action) in enumerate(extra_actions):
-        btn_y = y_offset + (len(sensation_colors) + j) * spacing
-        if window_width - 150 <= x <= window_width - 50 and btn_y <= y <= btn_y + 25:
-            action()
-            return
-        
+    toolbar.handle_click(x, y)
+
 def on_left_press(obj, event):
     mouse_down["left"] = not mouse_down["left"]
     print("set mouse down to true")
@@ -214,6 +227,32 @@ def on_left_release(obj,event):
 #plotter.iren.add_observer("MouseMoveEvent", draw_on_foot)
 plotter.iren.add_observer("LeftButtonPressEvent", handle_mouse_click)
 plotter.iren.add_observer("LeftButtonPressEvent", draw_on_foot)
+plotter.add_key_event("bracketleft", lambda: brush.shrink(brush_step))
+plotter.add_key_event("bracketright", lambda: brush.grow(brush_step))
+plotter.add_key_event("z", stroke.undo)
+plotter.add_key_event("y", stroke.redo)
+plotter.add_key_event("r", save_report)
+plotter.add_key_event("x", export_glb)
+plotter.add_key_event("m", export_matlab)
+
+# Screenshots and sessions are written on a background thread; the status line
+# at the bottom left reports when they are done
+writer = BackgroundWriter()
+status_text = plotter.add_text("", position=(10, 10), font_size=10, color="black", name="status_text")
+plotter.iren.add_observer("TimerEvent", report_saves)
+area_text = plotter.add_text("", position="upper_left", font_size=10, color="black", name="area_text")
+painter.on_change.append(update_area_readout)
+update_area_readout()
+
+# Toolbar: the button actors are created once, mode changes only restyle them
+toolbar = Toolbar(plotter, dist_from_edge=150)
+for sensation, color in sensation_colors.items():
+    toolbar.add_button(sensation, sensation.capitalize(), color, lambda s=sensation: set_sensation_mode(s))
+toolbar.add_button("stop", "Stop", "black", stop_drawing)
+toolbar.add_button("save", "Save", "green", save_image)
+toolbar.add_button("lock", "Lock", "black", set_screen_lock_mode)
+toolbar.add_button("unlock", "Unlock", "black", set_screen_unlock_mode)
+toolbar.add_button("quit", "Quit", "red", quit_application)
 
 # Initialize UI
 update_buttons("none")
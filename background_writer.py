@@ -0,0 +1,54 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+
+
+# Writes files on a worker thread so the interactor never waits for PNG
+# encoding or disk I/O. The caller hands over a cheap snapshot (a copied
+# state array, a captured framebuffer) together with a write function.
+# Every file is written to a temporary name next to its target and renamed
+# into place, so a reader never sees a half-written file. Finished (or
+# failed) writes are queued for the UI to pick up with poll().
+class BackgroundWriter:
+    def __init__(self, max_workers=1):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="background_writer")
+        self.finished = queue.SimpleQueue()
+
+    # write(tmp_path, *args, **kwargs) must create tmp_path
+    def submit(self, path, write, *args, **kwargs):
+        return self.executor.submit(self.run, path, write, args, kwargs)
+
+    def run(self, path, write, args, kwargs):
+        directory, name = os.path.split(os.path.abspath(path))
+        stem, extension = os.path.splitext(name)
+        # Keep the extension, some writers pick the format from it
+        tmp_path = os.path.join(directory, f".{stem}.tmp{threading.get_ident()}{extension}")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            write(tmp_path, *args, **kwargs)
+            os.replace(tmp_path, path)
+            self.finished.put((path, None))
+        except Exception as error:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self.finished.put((path, error))
+
+    # (path, error) for every write that finished since the last call
+    def poll(self):
+        results = []
+        while True:
+            try:
+                results.append(self.finished.get_nowait())
+            except queue.Empty:
+                return results
+
+    # Wait for pending writes, e.g. before quitting
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+def write_png(path, image):
+    Image.fromarray(np.asarray(image)).save(path)
@@ -0,0 +1,193 @@
+import argparse
+import functools
+import glob
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pyvista as pv
+from background_writer import write_png
+from foot_regions import coverage_table, label_regions, region_names
+from mesh_cache import load_mesh
+from paint_engine import build_lookup_table, build_palette, sensation_bits, state_dtype
+from report import ReportRenderer
+from session import load_session, session_state
+
+# Batch report over a directory of saved sessions.
+# Every session gets a multi-view report image, per-sensation stats (painted
+# area in cm²) and a per-region coverage table (percent of each anatomical
+# region painted), and an index.json lists them all. Sessions are spread over a process pool;
+# each worker parses a base mesh once (through the binary mesh cache) and
+# keeps its offscreen report renderer for every session on that mesh.
+#
+#   python batch_report.py Sessions --workers 8
+#
+# Besides session .npz files, old full-mesh saves (.vtk / .ply with
+# face_colors, e.g. modified_mesh.vtk) are reported too. Areas are converted
+# with the cm_per_unit the app saved in the session; --cm-per-unit is used for
+# files that don't record it.
+
+default_sensation_colors = {
+    "paresthesia": [1.0, 0.0, 0.0],
+    "pressure":    [1.0, 0.5, 0.0],
+    "movement":    [0.0, 0.0, 1.0],
+    "vibration":   [0.0, 1.0, 0.0],
+}
+
+
+# Per-worker caches: a base mesh is loaded once per worker, and one renderer
+# is kept per base mesh and sensation table
+@functools.lru_cache(maxsize=None)
+def base_mesh(mesh_file):
+    return load_mesh(mesh_file)
+
+
+# Surface area of every region of a base mesh, so a session's coverage table
+# only has to go over its painted cells
+@functools.lru_cache(maxsize=None)
+def base_region_areas(mesh_file):
+    mesh_data = base_mesh(mesh_file)[1]
+    return np.bincount(mesh_data["regions"], weights=mesh_data["areas"], minlength=len(region_names))
+
+
+@functools.lru_cache(maxsize=None)
+def session_renderer(mesh_file, sensations_json):
+    sensation_colors = json.loads(sensations_json)
+    mesh = base_mesh(mesh_file)[0].copy(deep=False)
+    mesh.cell_data["sensation_state"] = np.zeros(mesh.n_cells, dtype=state_dtype(sensation_colors))
+    renderer = ReportRenderer(mesh, build_lookup_table(build_palette(sensation_colors)))
+    return renderer, mesh
+
+
+# Cell count, area in cm² and share of the surface per sensation, plus any painting
+def sensation_stats(state, areas, sensation_colors, cm_per_unit):
+    painted = np.flatnonzero(state)
+    codes = state[painted]
+    painted_areas = areas[painted]
+    total_area = float(areas.sum())
+    stats = {}
+    for sensation, bit in dict(sensation_bits(sensation_colors), any=None).items():
+        has = codes != 0 if bit is None else (codes & bit) != 0
+        area = float(painted_areas[has].sum())
+        stats[sensation] = {"cells": int(has.sum()), "area_cm2": area * cm_per_unit ** 2,
+                            "percent": 100 * area / total_area}
+    return stats
+
+
+def report_session(path, mesh_override, cm_per_unit):
+    session = load_session(path)
+    metadata = session["metadata"]
+    sensation_colors = metadata["sensations"]
+    mesh_file = mesh_override or metadata.get("mesh_file")
+    if mesh_file is None:
+        raise ValueError(f"{path} does not record its mesh file, pass --mesh")
+    mesh, mesh_data = base_mesh(mesh_file)
+    if mesh_data["fingerprint"] != metadata["mesh_hash"]:
+        raise ValueError(f"{path} was not painted on {mesh_file}")
+
+    state = session_state(session, sensation_colors, state_dtype(sensation_colors))
+    renderer, report_mesh = session_renderer(mesh_file, json.dumps(sensation_colors))
+    report_mesh.cell_data["sensation_state"][:] = state
+    report_mesh.GetCellData().GetArray("sensation_state").Modified()
+    image = renderer.render()
+
+    areas = np.asarray(mesh_data["areas"])
+    stats = sensation_stats(state, areas, sensation_colors, metadata.get("cm_per_unit", cm_per_unit))
+    regions = coverage_table(state, np.asarray(mesh_data["regions"]), sensation_colors, areas,
+                             base_region_areas(mesh_file))
+    return {"mesh_file": mesh_file, "timestamp": metadata.get("timestamp"), "stats": stats,
+            "regions": regions.round(2).to_dict(orient="index")}, image
+
+
+# Old saves carry the whole mesh with averaged RGB face colors. Colors equal
+# to a palette entry (one sensation or the mean of several) are decoded to
+# that bitmask; any other painted color is counted as "other".
+def report_legacy_mesh(path, cm_per_unit):
+    mesh = pv.read(path)
+    if "face_colors" not in mesh.cell_data:
+        raise ValueError(f"{path} has no face_colors cell data")
+    colors = np.asarray(mesh.cell_data["face_colors"], dtype=np.float64)
+    sensation_colors = dict(default_sensation_colors, other=[0.3, 0.3, 0.3])
+    palette = build_palette(default_sensation_colors)
+
+    codes, exact = np.zeros(mesh.n_cells, dtype=np.int64), np.zeros(mesh.n_cells, dtype=bool)
+    for code, color in enumerate(palette):
+        match = np.all(np.abs(colors - color) < 1e-3, axis=1)
+        codes[match] = code
+        exact |= match
+    codes[~exact] = sensation_bits(sensation_colors)["other"]
+    state = codes.astype(state_dtype(sensation_colors))
+
+    mesh.cell_data["sensation_state"] = state
+    renderer = ReportRenderer(mesh, build_lookup_table(build_palette(sensation_colors)))
+    image = renderer.render()
+    renderer.close()
+
+    areas = np.asarray(mesh.compute_cell_sizes(length=False, area=True, volume=False).cell_data["Area"])
+    stats = sensation_stats(state, areas, sensation_colors, cm_per_unit)
+    # Every old save carries its own mesh, so its labels and region areas are computed here
+    labels = label_regions(mesh.cell_centers().points, mesh.cell_normals)
+    region_areas = np.bincount(labels, weights=areas, minlength=len(region_names))
+    regions = coverage_table(state, labels, sensation_colors, areas, region_areas)
+    return {"mesh_file": path, "timestamp": None, "stats": stats,
+            "regions": regions.round(2).to_dict(orient="index")}, image
+
+
+def report_one(path, output_dir, mesh_override=None, cm_per_unit=1.0):
+    start = time.perf_counter()
+    name = os.path.splitext(os.path.basename(path))[0]
+    try:
+        if path.endswith(".npz"):
+            record, image = report_session(path, mesh_override, cm_per_unit)
+        else:
+            record, image = report_legacy_mesh(path, cm_per_unit)
+        image_path = os.path.join(output_dir, f"{name}.png")
+        tmp_path = os.path.join(output_dir, f".{name}.tmp{os.getpid()}.png")
+        write_png(tmp_path, image)
+        os.replace(tmp_path, image_path)
+        record.update(session=path, image=image_path)
+    except Exception as error:
+        record = {"session": path, "error": f"{type(error).__name__}: {error}"}
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def find_sessions(directory):
+    paths = []
+    for pattern in ("*.npz", "*.vtk", "*.ply"):
+        paths.extend(glob.glob(os.path.join(directory, pattern)))
+    return sorted(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render report images and per-sensation stats for saved sessions.")
+    parser.add_argument("directory", help="directory with session .npz files (and/or old .vtk/.ply saves)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--output", help="output directory (default: <directory>/reports)")
+    parser.add_argument("--mesh", help="base mesh file to use instead of the one recorded in each session")
+    parser.add_argument("--cm-per-unit", type=float, default=1.0,
+                        help="mesh units in cm, for files that don't record it (human_foot.obj: 10)")
+    args = parser.parse_args()
+
+    output_dir = args.output or os.path.join(args.directory, "reports")
+    os.makedirs(output_dir, exist_ok=True)
+    paths = find_sessions(args.directory)
+
+    start = time.perf_counter()
+    # Fresh interpreters rather than forked ones, so no VTK/OpenGL state is inherited
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max(1, args.workers), mp_context=context) as pool:
+        records = list(pool.map(report_one, paths, [output_dir] * len(paths), [args.mesh] * len(paths),
+                                [args.cm_per_unit] * len(paths)))
+
+    index_path = os.path.join(output_dir, "index.json")
+    with open(index_path, "w") as f:
+        json.dump(records, f, indent=2)
+    failed = sum("error" in record for record in records)
+    print(f"Reported {len(records) - failed} of {len(records)} sessions in {time.perf_counter() - start:.1f} s -> {index_path}")
+
+
+if __name__ == "__main__":
+    main()
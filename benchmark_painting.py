@@ -0,0 +1,104 @@
+import time
+import numpy as np
+import pyvista as pv
+from brush import CellBrush
+from paint_engine import PaintEngine
+
+# Per-stroke painting latency, old copy-and-reassign path vs the in-place path.
+# Runs offscreen, so it also works on a headless box with software OpenGL:
+#   python benchmark_painting.py
+
+sensation_colors = {
+    "paresthesia": [1.0, 0.0, 0.0],
+    "pressure":    [1.0, 0.5, 0.0],
+    "movement":    [0.0, 0.0, 1.0],
+    "vibration":   [0.0, 1.0, 0.0],
+}
+
+
+# Foot meshes from the repo plus subdivided copies of mesh_test2 up to ~1.2M cells
+def load_benchmark_meshes(include_edited=False, max_level=3):
+    meshes = [
+        ("human_foot.obj", pv.read("Obj Files/human_foot.obj")),
+        ("mesh_test2.obj", pv.read("Obj Files/mesh_test2.obj")),
+    ]
+    if include_edited:
+        meshes.append(("edited.obj", pv.read("edited.obj")))
+    triangles = meshes[1][1].triangulate()
+    for level in range(1, max_level + 1):
+        meshes.append((f"mesh_test2 x{4 ** level} tris", triangles.subdivide(level, "linear")))
+    return meshes
+
+
+def time_strokes(mesh, stroke, n_strokes, render):
+    n_strokes = max(1, n_strokes)
+    plotter = pv.Plotter(off_screen=True)
+    painter = PaintEngine(plotter, mesh, sensation_colors)
+    if stroke is old_stroke:
+        mesh.cell_data["face_colors"] = np.ones((mesh.n_cells, 3)) * 0.8
+        mesh.set_active_scalars("face_colors", preference="cell")
+        plotter.add_mesh(mesh, scalars="face_colors", rgb=True)
+    else:
+        plotter.add_mesh(mesh, scalars="sensation_state", cmap=painter.lookup_table, show_scalar_bar=False)
+    plotter.show(auto_close=False)
+
+    brush = CellBrush(mesh, radius=0.5)
+    rng = np.random.default_rng(0)
+    centers = brush.centroids[rng.integers(0, mesh.n_cells, n_strokes)]
+    names = list(sensation_colors)
+
+    times = []
+    for i, center in enumerate(centers):
+        cells = brush.cells_at(center)
+        sensation = names[i % len(names)]
+        start = time.perf_counter()
+        stroke(painter, cells, sensation, render)
+        times.append(time.perf_counter() - start)
+    plotter.close()
+    return np.median(times) * 1000
+
+
+# Plotter.update_scalars as draw_on_foot called it. PyVista dropped it, so on
+# newer versions this does what it did: copy into the active scalars and mark
+# the cell data and the points modified (the points too, which makes the
+# mapper re-upload the geometry).
+def update_scalars(plotter, mesh, scalars, render):
+    if hasattr(plotter, "update_scalars"):
+        plotter.update_scalars(scalars, mesh=mesh, render=render)
+        return
+    data = mesh.GetCellData()
+    active = pv.convert_array(data.GetScalars())
+    active[:] = scalars
+    data.Modified()
+    mesh.GetPoints().Modified()
+    if render:
+        plotter.render()
+
+
+# What draw_on_foot used to do: blend float RGB against the default gray,
+# then copy the full array twice (mesh.cell_data assignment, then
+# update_scalars with another copy, which renders)
+def old_stroke(painter, cells, sensation, render):
+    mesh = painter.mesh
+    colors = mesh.cell_data["face_colors"]
+    new_color = np.asarray(sensation_colors[sensation])
+    current = colors[cells]
+    unpainted = np.all(np.isclose(current, 0.8), axis=1)
+    current[unpainted] = new_color
+    current[~unpainted] = (current[~unpainted] + new_color) / 2
+    colors[cells] = current
+    mesh.cell_data["face_colors"] = colors.copy()
+    update_scalars(painter.plotter, mesh, colors.copy(), render)
+
+
+def new_stroke(painter, cells, sensation, render):
+    painter.paint(cells, sensation, render)
+
+
+if __name__ == "__main__":
+    print(f"{'mesh':<26}{'cells':>10}{'old ms':>10}{'new ms':>10}{'old+render':>12}{'new+render':>12}")
+    for name, mesh in load_benchmark_meshes():
+        # Fewer rendered strokes on the big meshes, software rendering is slow there
+        n = 200 if mesh.n_cells < 100_000 else 50
+        row = [time_strokes(mesh, stroke, n, render) for render in (False, True) for stroke in (old_stroke, new_stroke)]
+        print(f"{name:<26}{mesh.n_cells:>10}{row[0]:>10.3f}{row[1]:>10.3f}{row[2]:>12.2f}{row[3]:>12.2f}")
@@ -0,0 +1,73 @@
+import sys
+import time
+import numpy as np
+import pyvista as pv
+from benchmark_painting import load_benchmark_meshes
+from picking import CellIdPicker, build_cell_picker
+
+# Pick latency (p50/p99) for the picker variants used by the painting apps.
+# Synthetic picks are fired at projected cell centroids, so nearly all of them
+# land on the foot. "agree %" is how often a picker returns the same cell as
+# the plain vtkCellPicker for the same pick, so the timings compare pickers
+# that give the same answers; the plain picker uses the locator pickers'
+# tolerance of 0 (the id buffer rasterizes, so it can differ along cell
+# edges). Runs offscreen:
+#   python benchmark_picking.py [n_picks]
+
+# The plain picker tests every cell, so it gets fewer picks on big meshes
+brute_force_budget = 2_000_000
+
+
+def pick_positions(plotter, centroids, n_picks, seed=0):
+    rng = np.random.default_rng(seed)
+    renderer = plotter.renderer
+    width, height = plotter.window_size
+    positions = []
+    for point in centroids[rng.integers(0, len(centroids), n_picks)]:
+        renderer.SetWorldPoint(*point, 1.0)
+        renderer.WorldToDisplay()
+        x, y, _ = renderer.GetDisplayPoint()
+        positions.append((min(max(int(x), 0), width - 1), min(max(int(y), 0), height - 1)))
+    return positions
+
+
+def time_picks(picker, renderer, positions):
+    times = np.empty(len(positions))
+    cell_ids = np.empty(len(positions), dtype=np.int64)
+    for i, (x, y) in enumerate(positions):
+        start = time.perf_counter()
+        picker.Pick(x, y, 0, renderer)
+        cell_ids[i] = picker.GetCellId()
+        times[i] = time.perf_counter() - start
+    return np.percentile(times, 50) * 1000, np.percentile(times, 99) * 1000, cell_ids
+
+
+if __name__ == "__main__":
+    n_picks = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    print(f"{'mesh':<26}{'cells':>10}  {'picker':<12}{'picks':>7}{'p50 ms':>10}{'p99 ms':>10}{'hit %':>8}{'agree %':>9}")
+    for name, mesh in load_benchmark_meshes(include_edited=True):
+        plotter = pv.Plotter(off_screen=True, window_size=[1024, 768])
+        actor = plotter.add_mesh(mesh)
+        plotter.show(auto_close=False)
+        centroids = np.asarray(mesh.cell_centers().points)
+
+        pickers = [
+            ("plain", build_cell_picker(actor, locator=None, tolerance=0.0)),
+            ("static", build_cell_picker(actor, locator="static")),
+            ("obb", build_cell_picker(actor, locator="obb")),
+            ("id buffer", CellIdPicker(mesh)),
+        ]
+        # Every picker gets the same positions; the plain one only the first n_plain
+        positions = pick_positions(plotter, centroids, n_picks)
+        n_plain = max(50, min(n_picks, brute_force_budget // mesh.n_cells))
+        reference = None
+        for label, picker in pickers:
+            n = n_plain if label == "plain" else n_picks
+            p50, p99, cell_ids = time_picks(picker, plotter.renderer, positions[:n])
+            if reference is None:
+                reference = cell_ids
+            agreement = np.mean(cell_ids[:len(reference)] == reference[:n])
+            hit_rate = np.mean(cell_ids >= 0)
+            print(f"{name:<26}{mesh.n_cells:>10}  {label:<12}{n:>7}{p50:>10.3f}{p99:>10.3f}"
+                  f"{hit_rate * 100:>8.1f}{agreement * 100:>9.1f}")
+        plotter.close()
@@ -0,0 +1,61 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import pyvista as pv
+from brush import CellBrush
+from mesh_cache import load_mesh
+from session import mesh_fingerprint
+
+# Time-to-first-frame of the painting apps' startup work: load the mesh,
+# derive what the apps need (centroids, fingerprint), draw the first frame.
+# Compares parsing the source file every start with the binary mesh cache
+# (cold = first load that builds the cache, warm = later starts). Offscreen:
+#   python benchmark_startup.py [mesh files...]
+
+default_meshes = ["Obj Files/human_foot.obj", "Obj Files/mesh_test2.obj", "edited.obj", "Obj Files/feet.obj"]
+
+
+def first_frame(mesh):
+    plotter = pv.Plotter(off_screen=True)
+    plotter.add_mesh(mesh)
+    plotter.show(auto_close=False)
+    plotter.close()
+
+
+def startup_uncached(path):
+    start = time.perf_counter()
+    mesh = pv.read(path)
+    mesh_fingerprint(mesh)
+    CellBrush(mesh)
+    loaded = time.perf_counter()
+    first_frame(mesh)
+    return loaded - start, time.perf_counter() - start
+
+
+def startup_cached(path, cache_dir):
+    start = time.perf_counter()
+    mesh, mesh_data = load_mesh(path, cache_dir)
+    CellBrush(mesh, centroids=mesh_data["centroids"])
+    loaded = time.perf_counter()
+    first_frame(mesh)
+    return loaded - start, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    paths = sys.argv[1:] or default_meshes
+    cache_dir = tempfile.mkdtemp(prefix="mesh_cache_")
+    first_frame(pv.Sphere())  # warm up the OpenGL context
+    # Each column is "load / first frame" in ms
+    print(f"{'mesh':<28}{'MB':>6}{'parse':>18}{'cache cold':>18}{'cache warm':>18}")
+    try:
+        for path in paths:
+            size = os.path.getsize(path) / 1e6
+            uncached = startup_uncached(path)
+            cold = startup_cached(path, cache_dir)
+            warm = min(startup_cached(path, cache_dir) for _ in range(3))
+            columns = "".join(f"{load * 1000:>9.1f} /{frame * 1000:>7.1f}" for load, frame in (uncached, cold, warm))
+            print(f"{path:<28}{size:>6.1f}{columns}")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
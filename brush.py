@@ -0,0 +1,62 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+# Radius brush for painting many cells per pick.
+# The KD-tree of cell centroids is built once when the mesh is loaded, so a
+# brush query only touches the cells near the picked point no matter how
+# dense the mesh is.
+class CellBrush:
+    def __init__(self, mesh, radius=0.5, centroids=None):
+        if centroids is None:
+            centroids = mesh.cell_centers().points
+        self.centroids = np.asarray(centroids, dtype=np.float64)
+        self.tree = cKDTree(self.centroids)
+        self.radius = radius
+
+        # Typical distance between neighbouring centroids, used to space
+        # the samples when a stroke segment is filled in
+        if len(self.centroids) > 1:
+            self.spacing = float(np.median(self.tree.query(self.centroids, k=2)[0][:, 1]))
+        else:
+            self.spacing = 0.0
+
+    # Cell ids whose centroid lies within the brush radius of a surface point.
+    # A radius of 0 falls back to the single nearest cell.
+    def cells_at(self, point, picked_cell_id=-1):
+        if self.radius <= 0:
+            if picked_cell_id >= 0:
+                return np.array([picked_cell_id], dtype=np.intp)
+            _, nearest = self.tree.query(point)
+            return np.array([nearest], dtype=np.intp)
+
+        cells = np.asarray(self.tree.query_ball_point(point, self.radius), dtype=np.intp)
+        if cells.size == 0 and picked_cell_id >= 0:
+            # Brush smaller than the picked cell: still paint the cell under the cursor
+            cells = np.array([picked_cell_id], dtype=np.intp)
+        return cells
+
+    # Cell ids covered by the brush dragged in a straight line from start to end.
+    # The chord between two picks cuts through the mesh, so every sample is
+    # snapped to its nearest cell centroid first; a fast drag whose picks land
+    # several cells apart then still paints a solid stroke on the surface.
+    def cells_along(self, start, end):
+        start = np.asarray(start, dtype=np.float64)
+        end = np.asarray(end, dtype=np.float64)
+        step = max(self.radius, self.spacing) / 2
+        length = np.linalg.norm(end - start)
+        n_samples = int(np.ceil(length / step)) + 1 if step > 0 else 2
+        samples = start + (end - start) * np.linspace(0.0, 1.0, n_samples)[:, None]
+
+        _, nearest = self.tree.query(samples)
+        if self.radius <= 0:
+            return np.unique(nearest)
+        hits = self.tree.query_ball_point(self.centroids[nearest], self.radius)
+        return np.unique(np.concatenate([np.asarray(h, dtype=np.intp) for h in hits]))
+
+    def grow(self, step=0.1):
+        self.radius += step
+
+    def shrink(self, step=0.1):
+        self.radius = max(0.0, self.radius - step)
+
@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pyvista as pv
+from paint_engine import state_dtype
+from report import ReportRenderer
+from session import load_session, session_state
+
+# Cohort store: the sensation state of many sessions painted on the same mesh,
+# kept as one sessions x cells matrix in a raw file (states.bin) that grows by
+# one row per added session and is read back memory-mapped. cohort.json holds
+# the mesh fingerprint, the sensation table and the list of added sessions;
+# its session count is the source of truth, so rows past it (a crash during
+# an append) are overwritten by the next append.
+#
+#   python cohort.py add Cohort Sessions/*.npz
+#   python cohort.py render Cohort --output Foot\ Maps/cohort.png
+
+
+class CohortStore:
+    def __init__(self, directory):
+        self.directory = directory
+        self.meta_path = os.path.join(directory, "cohort.json")
+        self.states_path = os.path.join(directory, "states.bin")
+        if os.path.isfile(self.meta_path):
+            with open(self.meta_path) as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = None
+
+    @property
+    def n_sessions(self):
+        return len(self.meta["sessions"]) if self.meta else 0
+
+    @property
+    def sensation_colors(self):
+        return self.meta["sensations"]
+
+    def dtype(self):
+        return np.dtype(state_dtype(self.sensation_colors))
+
+    def write_meta(self):
+        tmp_path = f"{self.meta_path}.tmp{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp_path, self.meta_path)
+
+    # The first session fixes the cohort's mesh and sensation table; later
+    # sessions must be painted on the same mesh and are remapped to that table
+    def add_session(self, path):
+        session = load_session(path, self.meta["mesh_hash"] if self.meta else None)
+        name = os.path.abspath(path)
+        if self.meta is None:
+            os.makedirs(self.directory, exist_ok=True)
+            metadata = session["metadata"]
+            self.meta = {
+                "mesh_hash": metadata["mesh_hash"],
+                "mesh_file": metadata.get("mesh_file"),
+                "n_cells": metadata["n_cells"],
+                "sensations": metadata["sensations"],
+                "sessions": [],
+            }
+        elif name in self.meta["sessions"]:
+            return False
+        state = session_state(session, self.sensation_colors, self.dtype())
+        self.append(state, name)
+        return True
+
+    def append(self, state, name):
+        row_bytes = self.meta["n_cells"] * self.dtype().itemsize
+        mode = "r+b" if os.path.exists(self.states_path) else "wb"
+        with open(self.states_path, mode) as f:
+            f.seek(self.n_sessions * row_bytes)
+            f.write(np.ascontiguousarray(state, dtype=self.dtype()).tobytes())
+            f.truncate()
+        self.meta["sessions"].append(name)
+        self.write_meta()
+
+    # Read-only sessions x cells view of the whole cohort
+    def states(self):
+        return np.memmap(self.states_path, dtype=self.dtype(), mode="r", shape=(self.n_sessions, self.meta["n_cells"]))
+
+    # Fraction of sessions that painted each sensation on each cell
+    # (sensations x cells). The cells are split into blocks that are reduced in
+    # parallel, and each block is read chunk_rows sessions at a time, so memory
+    # stays at workers x chunk_rows x block_cells whatever the cohort size.
+    def frequency(self, workers=None, chunk_rows=64, block_cells=1 << 18):
+        states = self.states()
+        n_sessions, n_cells = states.shape
+        n_sensations = len(self.sensation_colors)
+        counts = np.zeros((n_sensations, n_cells), dtype=np.uint32)
+        shifts = np.arange(n_sensations, dtype=states.dtype)
+
+        def reduce_block(start):
+            stop = min(start + block_cells, n_cells)
+            for row in range(0, n_sessions, chunk_rows):
+                chunk = np.asarray(states[row:row + chunk_rows, start:stop])
+                for j, shift in enumerate(shifts):
+                    counts[j, start:stop] += np.add.reduce((chunk >> shift) & 1, axis=0, dtype=np.uint32)
+
+        # numpy releases the GIL in these loops, so threads share the memmap and the output
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            list(pool.map(reduce_block, range(0, n_cells, block_cells)))
+        return counts / max(n_sessions, 1)
+
+
+# Multi-view heat map of one sensation's frequency on the template mesh
+def render_frequency(mesh, frequency, title=None, cmap="magma", window_size=(1600, 1200)):
+    mesh = mesh.copy(deep=False)
+    mesh.cell_data["frequency"] = np.asarray(frequency, dtype=np.float32)
+    lookup_table = pv.LookupTable(cmap=cmap, scalar_range=(0.0, 1.0))
+    renderer = ReportRenderer(mesh, lookup_table, scalars="frequency", window_size=window_size)
+    if title:
+        renderer.plotter.subplot(0, 0)
+        renderer.plotter.add_text(title, position="upper_right", font_size=10, color="black")
+    image = renderer.render()
+    renderer.close()
+    return image
+
+
+if __name__ == "__main__":
+    from background_writer import write_png
+    from mesh_cache import load_mesh
+
+    parser = argparse.ArgumentParser(description="Cohort frequency maps over saved sessions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="append sessions to a cohort store")
+    add.add_argument("store")
+    add.add_argument("sessions", nargs="+")
+    render = commands.add_parser("render", help="render one frequency map per sensation")
+    render.add_argument("store")
+    render.add_argument("--mesh", help="template mesh (default: the cohort's mesh file)")
+    render.add_argument("--output", default="cohort.png", help="output image; the sensation name is appended")
+    render.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    store = CohortStore(args.store)
+    if args.command == "add":
+        added = sum(store.add_session(path) for path in args.sessions)
+        print(f"Added {added} sessions, {store.n_sessions} in {args.store}")
+    else:
+        mesh, mesh_data = load_mesh(args.mesh or store.meta["mesh_file"])
+        if mesh_data["fingerprint"] != store.meta["mesh_hash"]:
+            raise SystemExit(f"{args.store} was not painted on this mesh")
+        frequency = store.frequency(workers=args.workers)
+        stem, extension = os.path.splitext(args.output)
+        for sensation, values in zip(store.sensation_colors, frequency):
+            path = f"{stem}_{sensation}{extension or '.png'}"
+            write_png(path, render_frequency(mesh, values, f"{sensation}: {store.n_sessions} sessions"))
+            print(f"Saved {path}")
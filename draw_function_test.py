@@ -5,6 +5,7 @@ import os
 from datetime import datetime
 import tkinter as tk
 import sys
+from mesh_cache import load_mesh
 
 # Get screen dimensions using tkinter
 root = tk.Tk()
@@ -12,8 +13,8 @@ screen_width = root.winfo_screenwidth()
 screen_height = root.winfo_screenheight()
 root.destroy()  # Clean up the hidden window
 
-# Load the 3D model
-mesh = pv.read("Obj Files/mesh_test2.obj")
+# Load the 3D model (welded, so neighbouring faces share their vertices)
+mesh, mesh_data = load_mesh("Obj Files/mesh_test2.obj")
 
 # Start PyVista plotter with screen size
 plotter = pv.Plotter(window_size=[screen_width, screen_height-100])
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+from scipy.io import savemat
+from vtk.util.numpy_support import vtk_to_numpy
+
+
+# Face connectivity of a PolyData as flat arrays: face i uses the point ids
+# connectivity[offsets[i]:offsets[i + 1]]
+def face_arrays(mesh):
+    polys = mesh.GetPolys()
+    offsets = vtk_to_numpy(polys.GetOffsetsArray()).astype(np.int64)
+    connectivity = vtk_to_numpy(polys.GetConnectivityArray()).astype(np.int64)
+    return offsets, connectivity
+
+
+# "(x, y, z); (x, y, z); ..." for every face, built with array string ops.
+# Each point is formatted once, faces of the same size are joined together.
+def vertex_coordinate_strings(mesh):
+    points = np.asarray(mesh.points)
+    coords = points.astype(str)
+    point_strings = np.char.add(np.char.add(np.char.add("(", coords[:, 0]), ", "), coords[:, 1])
+    point_strings = np.char.add(np.char.add(np.char.add(point_strings, ", "), coords[:, 2]), ")")
+
+    offsets, connectivity = face_arrays(mesh)
+    sizes = np.diff(offsets)
+    face_strings = np.empty(len(sizes), dtype=object)
+    for size in np.unique(sizes):
+        faces = np.flatnonzero(sizes == size)
+        point_ids = connectivity[offsets[faces][:, None] + np.arange(size)]
+        joined = point_strings[point_ids[:, 0]]
+        for k in range(1, size):
+            joined = np.char.add(np.char.add(joined, "; "), point_strings[point_ids[:, k]])
+        face_strings[faces] = joined
+    return face_strings
+
+
+# Same columns as the old per-face loop in mesh_visualization.py
+def face_table(mesh, face_colors):
+    face_colors = np.asarray(face_colors)
+    return pd.DataFrame({
+        "Face_Index": np.arange(len(face_colors)),
+        "Vertex_Coordinates": vertex_coordinate_strings(mesh),
+        "Red": face_colors[:, 0],
+        "Green": face_colors[:, 1],
+        "Blue": face_colors[:, 2],
+    })
+
+
+def write_face_csv(mesh, face_colors, path):
+    face_table(mesh, face_colors).to_csv(path, index=False)
+
+
+# Columnar binary export: points, face connectivity and colors stay separate
+# typed arrays, no text formatting at all
+def write_face_npz(mesh, face_colors, path, **extra_arrays):
+    offsets, connectivity = face_arrays(mesh)
+    np.savez(
+        path,
+        points=np.asarray(mesh.points),
+        offsets=offsets,
+        connectivity=connectivity,
+        face_colors=np.asarray(face_colors),
+        **extra_arrays,
+    )
+
+
+def read_face_npz(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+# Indexed mesh of the painted faces only: the vertices they use, a face index
+# matrix (one row per face, padded with -1 when face sizes differ), the face
+# colors and the original cell id of every face. Painted means not
+# default_color unless a painted mask is given (e.g. session state != 0).
+def painted_face_arrays(mesh, face_colors, painted=None, default_color=(0.8, 0.8, 0.8)):
+    face_colors = np.asarray(face_colors, dtype=np.float64)
+    if painted is None:
+        painted = np.any(np.abs(face_colors - default_color) > 1e-6, axis=1)
+    cell_ids = np.flatnonzero(painted)
+
+    offsets, connectivity = face_arrays(mesh)
+    sizes = np.diff(offsets)[cell_ids]
+    width = sizes.max() if len(sizes) else 3
+    corner = np.arange(width)
+    valid = corner < sizes[:, None]
+    corners = connectivity[np.where(valid, offsets[cell_ids][:, None] + corner, 0)]
+
+    used, faces = np.unique(corners[valid], return_inverse=True)
+    face_matrix = np.full(corners.shape, -1, dtype=np.int64)
+    face_matrix[valid] = faces.ravel()
+    return {
+        "vertices": np.asarray(mesh.points, dtype=np.float64)[used],
+        "faces": face_matrix,
+        "colors": face_colors[cell_ids],
+        "cell_ids": cell_ids,
+    }
+
+
+# Painted faces as .mat (for matlab_plotting.m) or .npz, picked by extension.
+# In the .mat file faces are 1-based with NaN padding, so MATLAB can pass them
+# straight to patch('Faces', faces, 'Vertices', vertices, ...).
+def write_painted_faces(mesh, face_colors, path, painted=None, default_color=(0.8, 0.8, 0.8)):
+    arrays = painted_face_arrays(mesh, face_colors, painted, default_color)
+    if path.endswith(".mat"):
+        faces = arrays["faces"].astype(np.float64) + 1
+        faces[arrays["faces"] < 0] = np.nan
+        savemat(path, dict(arrays, faces=faces), do_compression=True, oned_as="column")
+    else:
+        np.savez(path, **arrays)
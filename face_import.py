@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+from face_export import face_arrays
+from mesh_weld import collapse_faces, polydata_from_arrays, weld_point_ids
+
+# Reader for the face CSV written by face_export.write_face_csv
+# (Face_Index, "(x, y, z); (x, y, z); ...", Red, Green, Blue).
+
+
+# Every corner of every face, parsed in one pass: the coordinate strings are
+# joined into a single comma separated string, split once and converted as
+# one float array. Returns the corner coordinates and the face offsets.
+def parse_vertex_coordinates(strings):
+    strings = pd.Series(strings, dtype=object)
+    sizes = strings.str.count(";").to_numpy() + 1
+    text = ",".join(strings).replace(";", ",").replace("(", "").replace(")", "")
+    corners = np.array(text.split(","), dtype=np.float64).reshape(-1, 3)
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    if offsets[-1] != len(corners):
+        raise ValueError("Vertex_Coordinates does not hold three coordinates per corner")
+    return corners, offsets
+
+
+# Welded mesh and face colors from a face CSV.
+# Each face lists its own corner coordinates, so shared vertices appear once
+# per face in the file; corners within weld_tolerance are merged back into
+# one point. Faces that collapse in the weld are dropped together with their
+# colors, face_index holds the CSV Face_Index of every kept face.
+def read_face_csv(path, weld_tolerance=1e-5):
+    table = pd.read_csv(path, usecols=["Face_Index", "Vertex_Coordinates", "Red", "Green", "Blue"])
+    corners, offsets = parse_vertex_coordinates(table["Vertex_Coordinates"])
+
+    point_ids = weld_point_ids(corners, weld_tolerance)
+    points = np.empty((point_ids.max() + 1, 3)) if len(point_ids) else np.empty((0, 3))
+    points[point_ids] = corners
+    offsets, connectivity, kept = collapse_faces(offsets, point_ids)
+
+    mesh = polydata_from_arrays(points, offsets, connectivity)
+    face_colors = table[["Red", "Green", "Blue"]].to_numpy(dtype=np.float64)[kept]
+    return mesh, face_colors, table["Face_Index"].to_numpy()[kept]
+
+
+# Order independent 64-bit hash of each face's corner coordinates.
+# Coordinates are hashed as float32 bit patterns: the meshes here are float32
+# and the CSV prints them with their shortest round-trip repr, so a point
+# parses back to exactly the same float32 however it was written. (Rounding
+# to a number of decimals instead would put every value of the form
+# x.xxxxx5 on a rounding boundary.)
+def face_hashes(points, offsets, connectivity):
+    # + 0 turns -0.0 into 0.0
+    bits = (np.asarray(points, dtype=np.float32) + np.float32(0)).view(np.uint32).astype(np.uint64)
+    with np.errstate(over="ignore"):
+        point_hashes = (bits[:, 0] * np.uint64(0x9E3779B97F4A7C15)
+                        ^ bits[:, 1] * np.uint64(0xC2B2AE3D27D4EB4F)
+                        ^ bits[:, 2] * np.uint64(0x165667B19E3779F9))
+        # Mix each point hash before summing so different corner sets rarely add up alike
+        point_hashes ^= point_hashes >> np.uint64(31)
+        point_hashes *= np.uint64(0xBF58476D1CE4E5B9)
+        sizes = np.diff(offsets).astype(np.uint64)
+        return np.add.reduceat(point_hashes[connectivity], offsets[:-1]) + sizes * np.uint64(0x94D049BB133111EB)
+
+
+# Cell id in template of every face of mesh with the same corners, -1 where
+# the template has no such face
+def match_faces(mesh, template):
+    hashes = face_hashes(mesh.points, *face_arrays(mesh))
+    template_hashes = face_hashes(template.points, *face_arrays(template))
+
+    order = np.argsort(template_hashes)
+    sorted_hashes = template_hashes[order]
+    positions = np.minimum(np.searchsorted(sorted_hashes, hashes), len(order) - 1)
+    return np.where(sorted_hashes[positions] == hashes, order[positions], -1)
+
+
+# Face colors of an imported CSV carried over onto the canonical template
+# mesh; template faces missing from the CSV get default_color
+def template_face_colors(template, mesh, face_colors, default_color=(0.8, 0.8, 0.8)):
+    matches = match_faces(mesh, template)
+    colors = np.tile(np.asarray(default_color, dtype=np.float64), (template.n_cells, 1))
+    found = matches >= 0
+    colors[matches[found]] = np.asarray(face_colors)[found]
+    return colors, matches
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+from paint_engine import sensation_bits
+from report import foot_forward, foot_up, medial_direction
+
+# Anatomical region atlas.
+# Every cell gets one region label from its centroid and normal in foot
+# coordinates: u runs from heel (0) to toe tip (1), h is the height above
+# the sole in foot lengths. The thresholds are rough anatomical proportions
+# of an adult foot, good enough to tell heel from forefoot involvement, not
+# a segmentation.
+region_names = [
+    "hallux",
+    "lesser_toes",
+    "metatarsal_heads",
+    "arch",
+    "heel",
+    "dorsum",
+    "medial_malleolus",
+    "lateral_malleolus",
+    "leg",
+]
+region_ids = {name: i for i, name in enumerate(region_names)}
+
+toe_start = 0.8       # toes take the front fifth of the foot
+arch_start = 0.3      # the heel pad takes the back ~30%
+metatarsal_start = 0.62
+plantar_height = 0.12  # downward facing cells below this height are on the sole
+malleolus_height = (0.17, 0.33)
+malleolus_front = 0.45
+leg_height = 0.33
+
+
+def label_regions(centroids, normals, up=foot_up, forward=foot_forward, medial=None):
+    centroids = np.asarray(centroids, dtype=np.float64)
+    normals = np.asarray(normals, dtype=np.float64)
+    up = np.asarray(up, dtype=float)
+    forward = np.asarray(forward, dtype=float)
+    if medial is None:
+        medial = medial_direction(centroids, up, forward)
+    medial = np.asarray(medial, dtype=float)
+
+    along = centroids @ forward
+    length = np.ptp(along)
+    u = (along - along.min()) / length
+    h = (centroids @ up - (centroids @ up).min()) / length
+    across = centroids @ medial
+    toes = u >= toe_start
+
+    facing_down = normals @ up < -0.3
+    facing_side = np.abs(normals @ medial) > 0.5
+    plantar = facing_down & (h < plantar_height)
+
+    regions = np.full(len(centroids), region_ids["dorsum"], dtype=np.uint8)
+    regions[u < arch_start] = region_ids["heel"]
+    regions[plantar & (u >= arch_start)] = region_ids["arch"]
+    regions[plantar & (u >= metatarsal_start)] = region_ids["metatarsal_heads"]
+
+    # Toes, split at about a third of the forefoot width from the medial edge
+    toe_width = across[toes].max() - across[toes].min()
+    hallux_edge = across[toes].max() - 0.35 * toe_width
+    regions[toes] = np.where(across[toes] >= hallux_edge, region_ids["hallux"], region_ids["lesser_toes"])
+
+    # Ankle: the side faces at malleolus height, split at the ankle's own midline
+    back = u < malleolus_front
+    regions[back & (h >= leg_height)] = region_ids["leg"]
+    ankle = back & (h >= malleolus_height[0]) & (h < malleolus_height[1])
+    if ankle.any():
+        medial_side = across > (across[ankle].min() + across[ankle].max()) / 2
+        regions[ankle & facing_side & medial_side] = region_ids["medial_malleolus"]
+        regions[ankle & facing_side & ~medial_side] = region_ids["lateral_malleolus"]
+    return regions
+
+
+# Region x sensation coverage from a sensation state, in one bincount over the
+# (painted cell, sensation bit) pairs: the work grows with the painted cells,
+# not with total cells times regions. Returns painted cell counts and, with
+# areas given, painted area per region and sensation.
+def region_coverage(state, regions, n_sensations, areas=None):
+    state = np.asarray(state)
+    painted = np.flatnonzero(state)
+    cell, sensation = np.nonzero((state[painted][:, None].astype(np.int64) >> np.arange(n_sensations)) & 1)
+    keys = regions[painted[cell]].astype(np.int64) * n_sensations + sensation
+    size = len(region_names) * n_sensations
+    counts = np.bincount(keys, minlength=size).reshape(len(region_names), n_sensations)
+    if areas is None:
+        return counts, None
+    areas = np.asarray(areas)
+    painted_areas = np.bincount(keys, weights=areas[painted[cell]], minlength=size).reshape(len(region_names), n_sensations)
+    return counts, painted_areas
+
+
+# Per-region coverage as a table: percent of each region's surface painted
+# with each sensation. region_areas (np.bincount(regions, areas)) only
+# depends on the mesh and can be computed once.
+def coverage_table(state, regions, sensation_colors, areas, region_areas=None):
+    if region_areas is None:
+        region_areas = np.bincount(regions, weights=areas, minlength=len(region_names))
+    _, painted_areas = region_coverage(state, regions, len(sensation_colors), areas)
+    percent = 100 * painted_areas / np.maximum(region_areas, 1e-12)[:, None]
+    return pd.DataFrame(percent, index=region_names, columns=list(sensation_bits(sensation_colors)))
@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import struct
+import numpy as np
+from face_export import face_arrays
+from paint_engine import build_palette, state_dtype
+
+# Binary glTF (.glb) export of painted meshes, for lightweight web/desktop
+# viewers. Colors are stored as normalized uint8 RGBA per vertex. glTF only
+# interpolates vertex colors, so a point is duplicated once for every
+# distinct color of the faces around it; faces are flat colored while all the
+# unpainted surface still shares its vertices.
+
+gltf_float = 5126
+gltf_unsigned_byte = 5121
+gltf_unsigned_short = 5123
+gltf_unsigned_int = 5125
+gltf_array_buffer = 34962
+gltf_element_array_buffer = 34963
+
+
+# Fan-triangulate every face; returns the triangles' point ids and their face ids
+def triangulate_faces(offsets, connectivity):
+    sizes = np.diff(offsets)
+    triangles, face_ids = [], []
+    for size in np.unique(sizes):
+        faces = np.flatnonzero(sizes == size)
+        corners = connectivity[offsets[faces][:, None] + np.arange(size)]
+        for k in range(1, size - 1):
+            triangles.append(corners[:, [0, k, k + 1]])
+            face_ids.append(faces)
+    if not triangles:
+        return np.empty((0, 3), dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(triangles), np.concatenate(face_ids)
+
+
+# Spread the low 10 bits of x so there are two zero bits between each
+def spread_bits(x):
+    x = x.astype(np.uint32) & 0x3FF
+    x = (x | (x << 16)) & 0x030000FF
+    x = (x | (x << 8)) & 0x0300F00F
+    x = (x | (x << 4)) & 0x030C30C3
+    x = (x | (x << 2)) & 0x09249249
+    return x
+
+
+# Locality ordering in the spirit of meshoptimizer: triangles sorted along a
+# Morton (Z-order) curve of their centroids, then vertices renumbered in the
+# order the triangles first use them. Neighbouring triangles end up next to
+# each other in the index buffer and vertex fetches walk memory forwards.
+def reorder_triangles(triangles, points):
+    centroids = points[triangles].mean(axis=1)
+    low = centroids.min(axis=0)
+    extent = np.maximum(centroids.max(axis=0) - low, 1e-12)
+    cells = np.minimum((centroids - low) / extent * 1024, 1023)
+    morton = spread_bits(cells[:, 0]) | (spread_bits(cells[:, 1]) << 1) | (spread_bits(cells[:, 2]) << 2)
+    return np.argsort(morton, kind="stable")
+
+
+# Vertex buffers for a mesh whose face i has color palette[codes[i]]:
+# positions, RGBA colors and triangle indices
+def colored_vertex_arrays(mesh, codes, palette, reorder=True):
+    points = np.asarray(mesh.points, dtype=np.float32)
+    triangles, face_ids = triangulate_faces(*face_arrays(mesh))
+    corner_codes = np.repeat(np.asarray(codes, dtype=np.int64)[face_ids], 3)
+    if reorder and len(triangles):
+        order = reorder_triangles(triangles, points)
+        triangles, corner_codes = triangles[order], corner_codes.reshape(-1, 3)[order].ravel()
+
+    # One vertex per (point, color) pair, numbered by first use
+    keys = triangles.ravel() * len(palette) + corner_codes
+    unique_keys, first, indices = np.unique(keys, return_index=True, return_inverse=True)
+    first_use = np.argsort(first, kind="stable")
+    renumber = np.empty(len(first_use), dtype=np.int64)
+    renumber[first_use] = np.arange(len(first_use))
+    unique_keys = unique_keys[first_use]
+
+    colors = np.round(np.clip(np.asarray(palette, dtype=np.float64), 0, 1) * 255).astype(np.uint8)
+    rgba = np.hstack([colors, np.full((len(colors), 1), 255, dtype=np.uint8)])
+    return points[unique_keys // len(palette)], rgba[unique_keys % len(palette)], renumber[indices.ravel()]
+
+
+# Palette codes for arbitrary RGB face colors, after quantizing them to uint8
+def face_color_codes(face_colors):
+    quantized = np.round(np.clip(np.asarray(face_colors, dtype=np.float64), 0, 1) * 255).astype(np.uint8)
+    palette, codes = np.unique(quantized, axis=0, return_inverse=True)
+    return codes.ravel(), palette / 255.0
+
+
+# Write the arrays as one GLB: a JSON chunk describing them followed by one
+# binary chunk. The binary chunk is streamed straight from the arrays.
+def write_glb(path, positions, colors, indices, unlit=False):
+    index_type, index_dtype = (gltf_unsigned_short, np.uint16) if len(positions) < 65535 else (gltf_unsigned_int, np.uint32)
+    buffers = [
+        np.ascontiguousarray(indices, dtype=index_dtype),
+        np.ascontiguousarray(positions, dtype=np.float32),
+        np.ascontiguousarray(colors, dtype=np.uint8),
+    ]
+    targets = [gltf_element_array_buffer, gltf_array_buffer, gltf_array_buffer]
+
+    buffer_views, offset = [], 0
+    for array, target in zip(buffers, targets):
+        buffer_views.append({"buffer": 0, "byteOffset": offset, "byteLength": array.nbytes, "target": target})
+        offset += array.nbytes + (-array.nbytes % 4)  # every view starts 4-byte aligned
+
+    material = {"pbrMetallicRoughness": {"baseColorFactor": [1, 1, 1, 1], "metallicFactor": 0.0, "roughnessFactor": 1.0},
+                "doubleSided": True}
+    gltf = {
+        "asset": {"version": "2.0", "generator": "FeetPics glb_export"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 1, "COLOR_0": 2}, "indices": 0, "material": 0}]}],
+        "materials": [material],
+        "accessors": [
+            {"bufferView": 0, "componentType": index_type, "count": len(buffers[0]), "type": "SCALAR"},
+            {"bufferView": 1, "componentType": gltf_float, "count": len(positions), "type": "VEC3",
+             "min": buffers[1].min(axis=0).tolist() if len(positions) else [0, 0, 0],
+             "max": buffers[1].max(axis=0).tolist() if len(positions) else [0, 0, 0]},
+            {"bufferView": 2, "componentType": gltf_unsigned_byte, "normalized": True, "count": len(colors), "type": "VEC4"},
+        ],
+        "bufferViews": buffer_views,
+        "buffers": [{"byteLength": offset}],
+    }
+    if unlit:
+        material["extensions"] = {"KHR_materials_unlit": {}}
+        gltf["extensionsUsed"] = ["KHR_materials_unlit"]
+
+    json_chunk = json.dumps(gltf, separators=(",", ":")).encode()
+    json_chunk += b" " * (-len(json_chunk) % 4)
+    total = 12 + 8 + len(json_chunk) + 8 + offset
+    with open(path, "wb") as f:
+        f.write(struct.pack("<4sII", b"glTF", 2, total))
+        f.write(struct.pack("<I4s", len(json_chunk), b"JSON"))
+        f.write(json_chunk)
+        f.write(struct.pack("<I4s", offset, b"BIN\0"))
+        for array in buffers:
+            f.write(memoryview(array).cast("B"))
+            f.write(b"\0" * (-array.nbytes % 4))
+
+
+# GLB of a painted mesh from its per-cell sensation state
+def write_session_glb(path, mesh, state, sensation_colors, default_color=(0.8, 0.8, 0.8), reorder=True, unlit=False):
+    palette = build_palette(sensation_colors, default_color)
+    write_glb(path, *colored_vertex_arrays(mesh, state, palette, reorder), unlit=unlit)
+
+
+# GLB of a mesh with arbitrary RGB face colors (e.g. an old face_colors save)
+def write_face_colors_glb(path, mesh, face_colors, reorder=True, unlit=False):
+    codes, palette = face_color_codes(face_colors)
+    write_glb(path, *colored_vertex_arrays(mesh, codes, palette, reorder), unlit=unlit)
+
+
+if __name__ == "__main__":
+    from mesh_cache import load_mesh
+    from session import load_session, session_state
+
+    parser = argparse.ArgumentParser(description="Export a saved session as binary glTF.")
+    parser.add_argument("session", help="session .npz file")
+    parser.add_argument("--mesh", help="base mesh file (default: the one recorded in the session)")
+    parser.add_argument("--output", help="output .glb (default: next to the session)")
+    parser.add_argument("--no-reorder", action="store_true", help="keep the mesh's own triangle order")
+    parser.add_argument("--unlit", action="store_true", help="flat colors without lighting (KHR_materials_unlit)")
+    args = parser.parse_args()
+
+    session = load_session(args.session)
+    mesh, mesh_data = load_mesh(args.mesh or session["metadata"]["mesh_file"])
+    sensation_colors = session["metadata"]["sensations"]
+    if session["metadata"]["mesh_hash"] != mesh_data["fingerprint"]:
+        raise SystemExit(f"{args.session} was painted on a different mesh")
+    state = session_state(session, sensation_colors, state_dtype(sensation_colors))
+    output = args.output or os.path.splitext(args.session)[0] + ".glb"
+    write_session_glb(output, mesh, state, sensation_colors, reorder=not args.no_reorder, unlit=args.unlit)
+    print(f"Saved {output} ({os.path.getsize(output) / 1e6:.2f} MB)")
@@ -0,0 +1,154 @@
+import time
+import numpy as np
+import pyvista as pv
+import vtk
+from scipy.spatial import cKDTree
+
+
+# Decimated stand-in of a mesh with roughly proxy_cells triangles.
+# Quadric clustering merges the vertices in each cell of a uniform grid; it is
+# linear in the mesh size (about 0.5 s for 1.25M cells, where quadric edge
+# collapse takes ~20 s), and a proxy only has to look right while moving.
+# The grid spacing follows from the surface area: about 2.6 triangles per grid
+# cell crossing the surface.
+def proxy_mesh(mesh, proxy_cells):
+    spacing = np.sqrt(2.6 * mesh.area / proxy_cells)
+    divisions = np.maximum(np.ceil(np.ptp(np.asarray(mesh.points), axis=0) / spacing).astype(int), 1)
+    clustering = vtk.vtkQuadricClustering()
+    clustering.SetInputData(mesh)
+    clustering.AutoAdjustNumberOfDivisionsOff()
+    clustering.SetNumberOfDivisions(*divisions.tolist())
+    clustering.Update()
+    return pv.wrap(clustering.GetOutput())
+
+
+# For every source cell the nearest target cell facing the same way (among
+# the k nearest centroids), so thin parts like toes don't map through to the
+# opposite surface; falls back to the plain nearest cell
+def nearest_facing_cells(source_centroids, source_normals, target_centroids, target_normals, k=4):
+    k = min(k, len(target_centroids))
+    _, nearest = cKDTree(target_centroids).query(source_centroids, k=k, workers=-1)
+    nearest = nearest.reshape(len(source_centroids), k)
+    facing = np.einsum("nkd,nd->nk", target_normals[nearest], source_normals) > 0
+    choice = np.where(facing.any(axis=1), facing.argmax(axis=1), 0)
+    return nearest[np.arange(len(nearest)), choice]
+
+
+# Level-of-detail view for dense meshes.
+# A decimated proxy of the painted mesh is shown while the camera moves or
+# paint is landing; once nothing happened for idle_delay seconds the full
+# resolution mesh is shown again. Painting always writes the full-resolution
+# state; the proxy's state is derived from it: each proxy cell shows the
+# union of the sensations on the full cells mapped to it (full_to_proxy),
+# recomputed only for the proxy cells a change touches. proxy_to_full maps a
+# proxy cell back to a full cell, for picks that hit the proxy.
+# Meshes below min_cells are left alone.
+class LodView:
+    def __init__(self, plotter, painter, actor, proxy_cells=100_000, min_cells=500_000, idle_delay=0.3,
+                 scalars="sensation_state"):
+        self.plotter = plotter
+        self.painter = painter
+        self.actor = actor
+        self.idle_delay = idle_delay
+        self.enabled = painter.mesh.n_cells >= min_cells
+        self.showing_proxy = False
+        self.last_activity = 0.0
+        if not self.enabled:
+            return
+
+        mesh = painter.mesh
+        proxy = proxy_mesh(mesh, proxy_cells)
+
+        full_centroids = np.asarray(mesh.cell_centers().points)
+        full_normals = np.asarray(mesh.cell_normals)
+        proxy_centroids = np.asarray(proxy.cell_centers().points)
+        proxy_normals = np.asarray(proxy.cell_normals)
+        self.full_to_proxy = nearest_facing_cells(full_centroids, full_normals, proxy_centroids, proxy_normals)
+        self.proxy_to_full = nearest_facing_cells(proxy_centroids, proxy_normals, full_centroids, full_normals)
+
+        # Full cells grouped by proxy cell; proxy cells without any take their proxy_to_full cell
+        self.order = np.argsort(self.full_to_proxy, kind="stable")
+        self.counts = np.bincount(self.full_to_proxy, minlength=proxy.n_cells)
+        self.starts = np.concatenate([[0], np.cumsum(self.counts)[:-1]])
+        self.empty = np.flatnonzero(self.counts == 0)
+
+        proxy.cell_data[scalars] = np.zeros(proxy.n_cells, dtype=painter.state.dtype)
+        self.proxy = proxy
+        self.proxy_state = proxy.cell_data[scalars]
+        self.vtk_proxy_state = proxy.GetCellData().GetArray(scalars)
+        self.proxy_actor = plotter.add_mesh(proxy, scalars=scalars, cmap=painter.lookup_table, show_scalar_bar=False,
+                                            reset_camera=False)
+        self.proxy_actor.SetVisibility(False)
+        self.update_proxy(None)
+
+        # Camera moves are noticed when a render starts; comparing the pose
+        # ignores clipping range updates, which modify the camera on every render
+        self.camera_pose = None
+        painter.on_change.append(self.on_paint)
+        plotter.renderer.AddObserver("StartEvent", self.on_render)
+        plotter.iren.add_observer("TimerEvent", self.on_timer)
+
+    # Recompute the proxy state of the proxy cells the changed full cells map to
+    def update_proxy(self, cells):
+        state = self.painter.state
+        if cells is None:
+            proxies = np.flatnonzero(self.counts)
+        else:
+            proxies = np.unique(self.full_to_proxy[cells])
+        if len(proxies):
+            counts = self.counts[proxies]
+            segment_starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            members = np.repeat(self.starts[proxies] - segment_starts, counts) + np.arange(counts.sum())
+            self.proxy_state[proxies] = np.bitwise_or.reduceat(state[self.order[members]], segment_starts)
+        self.proxy_state[self.empty] = state[self.proxy_to_full[self.empty]]
+        self.vtk_proxy_state.Modified()
+
+    def show_proxy(self, show):
+        if show != self.showing_proxy:
+            self.showing_proxy = show
+            self.proxy_actor.SetVisibility(show)
+            self.actor.SetVisibility(not show)
+
+    def on_paint(self, cells):
+        self.update_proxy(cells)
+        self.last_activity = time.perf_counter()
+        self.show_proxy(True)
+
+    def on_render(self, *args):
+        camera = self.plotter.renderer.GetActiveCamera()
+        pose = (camera.GetPosition(), camera.GetFocalPoint(), camera.GetViewUp(), camera.GetViewAngle(),
+                camera.GetParallelScale())
+        if pose != self.camera_pose:
+            if self.camera_pose is not None:
+                self.last_activity = time.perf_counter()
+                self.show_proxy(True)
+            self.camera_pose = pose
+
+    # Back to full resolution once the input has been idle long enough
+    def on_timer(self, *args):
+        if self.showing_proxy and time.perf_counter() - self.last_activity >= self.idle_delay:
+            self.show_proxy(False)
+            self.plotter.render()
+
+
+# Picker wrapper for LodView: a pick that lands on the proxy reports the
+# matching full-resolution cell, so the brush and the painter only ever see
+# full cell ids. Same Pick / GetCellId / GetPickPosition calls as vtkCellPicker.
+class LodPicker:
+    def __init__(self, picker, lod):
+        self.picker = picker
+        self.lod = lod
+        self.cell_id = -1
+
+    def Pick(self, x, y, z, renderer):
+        result = self.picker.Pick(x, y, z, renderer)
+        self.cell_id = self.picker.GetCellId()
+        if self.cell_id >= 0 and self.lod.showing_proxy and self.picker.GetActor() == self.lod.proxy_actor:
+            self.cell_id = int(self.lod.proxy_to_full[self.cell_id])
+        return result
+
+    def GetCellId(self):
+        return self.cell_id
+
+    def GetPickPosition(self):
+        return self.picker.GetPickPosition()
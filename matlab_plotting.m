@@ -1,54 +1,19 @@
-% Load the CSV file with vertex coordinates and color data
-csvFile = 'face_data_with_vertex_coords.csv';
-data = readtable(csvFile);
+% Load the painted faces exported by face_export.write_painted_faces
+% (mesh_visualization.py writes painted_faces.mat). Only non-gray faces are
+% in the file, already indexed:
+%   vertices  - shared vertex coordinates (N x 3)
+%   faces     - 1-based vertex indices per face, NaN padded (F x K)
+%   colors    - RGB color of each face, 0-1 (F x 3)
+%   cell_ids  - original face index of each face (0-based, as in the CSV)
+matFile = 'painted_faces.mat';
+data = load(matFile);
 
-% Initialize arrays for vertices and colors
-faces = [];
-vertices = [];
-colors = [];
-
-% Define normalized gray threshold
-initialGray = [0.8, 0.8, 0.8];
-
-% Iterate over each row in the data table
-for i = 1:height(data)
-    % Extract RGB color information and normalize to 0-1 range
-    color = [data.Red(i), data.Green(i), data.Blue(i)];
-    
-    %test = (round(color * 100) / 100)
-    
-    % Check if the color is not gray
-    if ~isequal(color, initialGray)  % Use rounding to avoid floating point precision issues
-        % Parse the vertex coordinates
-        coordStrings = split(data.Vertex_Coordinates{i}, '; ');
-        numVertices = numel(coordStrings);
-        faceIndices = zeros(1, numVertices);
-    
-        for j = 1:numVertices
-            % Extract x, y, z from each coordinate string
-            coordStr = coordStrings{j};
-            coords = sscanf(coordStr, '(%f, %f, %f)');
-            vertices = [vertices; coords'];
-            faceIndices(j) = size(vertices, 1); % Index of the current vertex
-        end
-    
-        % Append face indices and colors
-        faces = [faces; faceIndices];
-        colors = [colors; color];
-    end
-end
-
-% Plot the mesh using patch
+% Plot all faces with a single patch, one flat color per face
 figure;
-hold on;
-for i = 1:size(faces, 1)
-    % Get current face vertices and color
-    faceVerts = vertices(faces(i, :), :);
-    fill3(faceVerts(:, 1), faceVerts(:, 2), faceVerts(:, 3), colors(i, :), 'EdgeColor', 'none');
-end
-hold off;
+patch('Faces', data.faces, 'Vertices', data.vertices, ...
+      'FaceVertexCData', data.colors, 'FaceColor', 'flat', 'EdgeColor', 'none');
 axis equal;
 xlabel('X');
 ylabel('Y');
 zlabel('Z');
-title('3D Mesh Visualization - Non-Gray Faces Only');
\ No newline at end of file
+title('3D Mesh Visualization - Non-Gray Faces Only');
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pyvista as pv
+from vtk.util.numpy_support import numpy_to_vtk
+from face_export import face_arrays
+from foot_regions import label_regions, region_names
+from mesh_weld import polydata_from_arrays, weld_mesh
+from session import mesh_fingerprint
+
+cache_root = ".mesh_cache"
+cache_version = 3
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Canonical (welded) geometry plus the derived per-cell data the apps need at
+# startup. old_to_new maps the source file's cell ids to the canonical ones;
+# regions holds each cell's anatomical region (foot_regions.region_names).
+def preprocess(mesh, weld_tolerance=1e-6):
+    mesh, old_to_new = weld_mesh(mesh, tolerance=weld_tolerance)
+    offsets, connectivity = face_arrays(mesh)
+    sizes = mesh.compute_cell_sizes(length=False, area=True, volume=False)
+    centroids = np.asarray(mesh.cell_centers().points, dtype=np.float64)
+    normals = np.asarray(mesh.cell_normals, dtype=np.float32)
+    return {
+        "points": np.asarray(mesh.points, dtype=np.float64),
+        "offsets": offsets,
+        "connectivity": connectivity,
+        "normals": normals,
+        "centroids": centroids,
+        "areas": np.asarray(sizes.cell_data["Area"], dtype=np.float64),
+        "old_to_new": old_to_new,
+        "regions": label_regions(centroids, normals),
+    }
+
+
+def bundle_is_current(meta, weld_tolerance):
+    return meta.get("version") == cache_version and meta.get("weld_tolerance") == weld_tolerance
+
+
+# Several processes may load the same mesh cold at once (batch_report.py's
+# workers). Each writes its own tmp bundle; the first to publish wins and the
+# others drop theirs. Only a stale bundle (old version or other weld
+# tolerance) is ever removed, by moving it aside in one rename first, so a
+# current bundle another process is reading is never deleted.
+def write_bundle(directory, arrays, meta, publish_attempts=5):
+    tmp_directory = f"{directory}.tmp{os.getpid()}"
+    os.makedirs(tmp_directory, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_directory, f"{name}.npy"), np.ascontiguousarray(array))
+    with open(os.path.join(tmp_directory, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    for _ in range(publish_attempts):
+        existing = read_bundle_meta(directory)
+        if existing is not None and bundle_is_current(existing, meta["weld_tolerance"]):
+            break
+        if os.path.isdir(directory):
+            stale_directory = f"{directory}.stale{os.getpid()}"
+            try:
+                os.replace(directory, stale_directory)
+            except OSError:
+                continue
+            shutil.rmtree(stale_directory, ignore_errors=True)
+        # Publish the finished bundle in one step so a crash never leaves half a cache
+        try:
+            os.replace(tmp_directory, directory)
+            return
+        except OSError:
+            # Another process published first
+            continue
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+
+
+def read_bundle_meta(directory):
+    try:
+        with open(os.path.join(directory, "meta.json")) as f:
+            return json.load(f)
+    except (FileNotFoundError, NotADirectoryError, json.JSONDecodeError):
+        return None
+
+
+def read_bundle(directory):
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+    arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in meta["arrays"]}
+    return arrays, meta
+
+
+# The current bundle in directory, or None if there is none (or it is stale).
+# A read that races with a stale bundle being replaced is retried.
+def read_current_bundle(directory, weld_tolerance, attempts=3):
+    for attempt in range(attempts):
+        if not os.path.isfile(os.path.join(directory, "meta.json")):
+            return None
+        try:
+            arrays, meta = read_bundle(directory)
+        except (FileNotFoundError, json.JSONDecodeError):
+            time.sleep(0.05 * (attempt + 1))
+            continue
+        return (arrays, meta) if bundle_is_current(meta, weld_tolerance) else None
+    return None
+
+
+# PolyData straight from the bundle arrays, no text parsing
+def mesh_from_arrays(arrays):
+    mesh = polydata_from_arrays(arrays["points"], arrays["offsets"], arrays["connectivity"])
+    mesh.GetCellData().SetNormals(numpy_to_vtk(np.asarray(arrays["normals"]), deep=True))
+    return mesh
+
+
+# Load a mesh through the binary cache.
+# The first load parses the source file, welds it into a canonical mesh and
+# writes points, faces, normals, centroids, areas, the old-to-new cell id map
+# and the region labels as .npy files under .mesh_cache/<source sha256>/;
+# later loads memory-map that bundle instead of parsing the OBJ again.
+# Returns the mesh and a dict with the cached arrays plus the mesh fingerprint.
+def load_mesh(path, cache_dir=cache_root, weld_tolerance=1e-6):
+    directory = os.path.join(cache_dir, file_hash(path))
+    cached = read_current_bundle(directory, weld_tolerance)
+    if cached is not None:
+        arrays, meta = cached
+        mesh = mesh_from_arrays(arrays)
+        return mesh, dict(arrays, fingerprint=meta["fingerprint"])
+
+    mesh = pv.read(path)
+    arrays = preprocess(mesh, weld_tolerance)
+    mesh = mesh_from_arrays(arrays)
+    meta = {
+        "version": cache_version,
+        "source": os.path.abspath(path),
+        "n_cells": int(mesh.n_cells),
+        "weld_tolerance": weld_tolerance,
+        "fingerprint": mesh_fingerprint(mesh),
+        "region_names": region_names,
+        "arrays": list(arrays),
+    }
+    write_bundle(directory, arrays, meta)
+    cached = read_current_bundle(directory, weld_tolerance)
+    if cached is None:
+        # Lost a race with a process caching the mesh under other settings;
+        # the arrays just computed are the same data
+        return mesh, dict(arrays, fingerprint=meta["fingerprint"])
+    arrays, meta = cached
+    return mesh, dict(arrays, fingerprint=meta["fingerprint"])
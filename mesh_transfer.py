@@ -0,0 +1,164 @@
+import argparse
+import hashlib
+import os
+import numpy as np
+from scipy.sparse import csr_matrix, load_npz, save_npz
+from scipy.spatial import cKDTree
+from mesh_cache import cache_root
+from report import foot_forward, foot_up, medial_direction
+
+# Transfer of painted sessions between foot meshes.
+# The source mesh is registered onto the target (mirrored if it is the other
+# foot, scaled by foot length, then refined with a trimmed similarity ICP on
+# area-weighted cell centroids) and every target cell gets its source cells
+# from the registered geometry:
+#   nearest  - the source cell with the nearest centroid (an index array)
+#   overlap  - every source cell is assigned to its nearest target cell and
+#              a target cell takes a sensation when the source cells painted
+#              with it cover at least half of its assigned area (a sparse
+#              area-weight matrix; better when the target is coarser)
+# The tables are cached under .mesh_cache/transfer/ by the two mesh
+# fingerprints, so transferring sessions afterwards is one gather (or one
+# sparse product) for any number of sessions.
+
+transfer_version = 1
+icp_iterations = 40
+icp_keep = 0.8  # fraction of closest pairs used per ICP step, the rest are treated as non-overlapping
+
+
+# Weighted least-squares similarity transform (scale, rotation, translation)
+# mapping source onto target points (Umeyama)
+def similarity_transform(source, target, weights):
+    weights = weights / weights.sum()
+    source_mean = weights @ source
+    target_mean = weights @ target
+    x = source - source_mean
+    y = target - target_mean
+    covariance = (y * weights[:, None]).T @ x
+    u, s, vt = np.linalg.svd(covariance)
+    d = np.ones(3)
+    d[2] = np.sign(np.linalg.det(u @ vt))
+    rotation = u @ np.diag(d) @ vt
+    scale = (s * d).sum() / (weights @ (x ** 2).sum(axis=1))
+    return scale, rotation, target_mean - scale * rotation @ source_mean
+
+
+# Source points moved into the target's frame
+def register(source, target, source_weights, up=foot_up, forward=foot_forward):
+    up = np.asarray(up, dtype=float)
+    forward = np.asarray(forward, dtype=float)
+    source = np.array(source, dtype=np.float64)
+
+    # Left onto right foot: mirror across the sagittal plane
+    source_medial = medial_direction(source, up, forward)
+    if source_medial @ medial_direction(target, up, forward) < 0:
+        source -= 2 * np.outer(source @ source_medial, source_medial)
+
+    # Coarse alignment: same foot length, heels and soles on top of each other, centered sideways
+    scale = np.ptp(target @ forward) / np.ptp(source @ forward)
+    source = source * scale
+    side = np.cross(up, forward)
+    for axis, anchor in ((forward, np.min), (up, np.min), (side, lambda v: (v.min() + v.max()) / 2)):
+        source += (anchor(target @ axis) - anchor(source @ axis)) * axis
+
+    tree = cKDTree(target)
+    for _ in range(icp_iterations):
+        distances, nearest = tree.query(source)
+        keep = distances <= np.quantile(distances, icp_keep)
+        scale, rotation, translation = similarity_transform(source[keep], target[nearest[keep]], source_weights[keep])
+        source = scale * source @ rotation.T + translation
+        converged = abs(scale - 1) < 1e-6 and np.abs(rotation - np.eye(3)).max() < 1e-6
+        if converged and np.abs(translation).max() < 1e-6 * np.ptp(target):
+            break
+    return source
+
+
+def build_correspondence(source_data, target_data, method="nearest"):
+    source_centroids = register(source_data["centroids"], np.asarray(target_data["centroids"]), np.asarray(source_data["areas"]))
+    target_centroids = np.asarray(target_data["centroids"])
+    nearest_source = cKDTree(source_centroids).query(target_centroids)[1]
+    if method == "nearest":
+        return nearest_source
+    if method != "overlap":
+        raise ValueError(f"Unknown correspondence method {method!r}")
+
+    # Each source cell's area goes to its nearest target cell; target cells
+    # that receive nothing fall back to their nearest source cell
+    n_target, n_source = len(target_centroids), len(source_centroids)
+    assigned = cKDTree(target_centroids).query(source_centroids)[1]
+    empty = np.bincount(assigned, minlength=n_target) == 0
+    rows = np.concatenate([assigned, np.flatnonzero(empty)])
+    columns = np.concatenate([np.arange(n_source), nearest_source[empty]])
+    weights = np.concatenate([np.asarray(source_data["areas"]), np.ones(empty.sum())])
+    matrix = csr_matrix((weights, (rows, columns)), shape=(n_target, n_source))
+    row_sums = np.asarray(matrix.sum(axis=1)).ravel()
+    return csr_matrix(matrix.multiply(1 / row_sums[:, None]))
+
+
+# Correspondence table from source to target cells, built once per mesh pair
+def load_correspondence(source_data, target_data, method="nearest", cache_dir=cache_root):
+    key = hashlib.sha256(f"{transfer_version}:{method}:{source_data['fingerprint']}:{target_data['fingerprint']}".encode()).hexdigest()
+    directory = os.path.join(cache_dir, "transfer")
+    path = os.path.join(directory, f"{key}.npz")
+    if os.path.isfile(path):
+        return load_npz(path) if method == "overlap" else np.load(path)["table"]
+
+    table = build_correspondence(source_data, target_data, method)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{key}.tmp{os.getpid()}.npz")
+    if method == "overlap":
+        save_npz(tmp_path, table)
+    else:
+        np.savez(tmp_path, table=table)
+    os.replace(tmp_path, path)
+    return table
+
+
+# Sensation states of one session (source cells) or many (sessions x source
+# cells) carried over to the target cells
+def transfer_states(table, states, n_sensations=None):
+    states = np.asarray(states)
+    if isinstance(table, np.ndarray):
+        return states[..., table]
+
+    if n_sensations is None:
+        n_sensations = int(states.max()).bit_length() if states.size else 0
+    rows = np.atleast_2d(states)
+    result = np.zeros((len(rows), table.shape[0]), dtype=states.dtype)
+    for j in range(n_sensations):
+        covered = table @ ((rows.T >> j) & 1).astype(np.float64)
+        result |= ((covered.T >= 0.5) << j).astype(states.dtype)
+    return result.reshape(states.shape[:-1] + (table.shape[0],))
+
+
+if __name__ == "__main__":
+    from mesh_cache import load_mesh
+    from paint_engine import state_dtype
+    from session import load_session, save_session, session_state
+
+    parser = argparse.ArgumentParser(description="Transfer saved sessions onto another foot mesh.")
+    parser.add_argument("sessions", nargs="+", help="session .npz files (all painted on the same mesh)")
+    parser.add_argument("--target", required=True, help="target mesh file")
+    parser.add_argument("--source", help="source mesh file (default: the one recorded in the sessions)")
+    parser.add_argument("--method", choices=["nearest", "overlap"], default="nearest")
+    parser.add_argument("--suffix", default="_transferred", help="appended to each output session's name")
+    args = parser.parse_args()
+
+    sessions = [load_session(path) for path in args.sessions]
+    source_mesh, source_data = load_mesh(args.source or sessions[0]["metadata"]["mesh_file"])
+    target_mesh, target_data = load_mesh(args.target)
+    table = load_correspondence(source_data, target_data, args.method)
+
+    sensation_colors = sessions[0]["metadata"]["sensations"]
+    dtype = state_dtype(sensation_colors)
+    for session in sessions:
+        if session["metadata"]["mesh_hash"] != source_data["fingerprint"]:
+            raise SystemExit("All sessions must be painted on the source mesh")
+    states = np.stack([session_state(session, sensation_colors, dtype) for session in sessions])
+    transferred = transfer_states(table, states, len(sensation_colors))
+
+    for path, state in zip(args.sessions, transferred):
+        output = os.path.splitext(path)[0] + args.suffix + ".npz"
+        save_session(output, state, sensation_colors, target_data["fingerprint"], mesh_file=args.target,
+                     transferred_from=os.path.abspath(path))
+        print(f"Saved {output}")
@@ -1,15 +1,43 @@
+import glob
+import os
+import sys
 import pyvista as pv
 import numpy as np
-import pandas as pd
+from face_export import write_face_csv, write_face_npz, write_painted_faces
+from mesh_cache import load_mesh
+from paint_engine import build_palette, state_dtype
+from session import load_session, session_state
 
-# Load the modified mesh
-mesh = pv.read("modified_mesh.vtk")
+#   python mesh_visualization.py [session.npz]
+# Without an argument the newest session in Sessions/ is used. Old full-mesh
+# saves with face_colors (e.g. modified_mesh.vtk) can be given as well.
+if len(sys.argv) > 1:
+    session_file = sys.argv[1]
+else:
+    saved = glob.glob(os.path.join("Sessions", "*.npz"))
+    if not saved:
+        sys.exit("No sessions in Sessions/, pass a session file")
+    session_file = max(saved, key=os.path.getmtime)
+
+if session_file.endswith(".npz"):
+    # Rebuild the face colors from the session's sensation bitmask on its base mesh
+    session = load_session(session_file)
+    mesh, mesh_data = load_mesh(session["metadata"]["mesh_file"])
+    if session["metadata"]["mesh_hash"] != mesh_data["fingerprint"]:
+        sys.exit(f"{session_file} was painted on a different mesh")
+    sensation_colors = session["metadata"]["sensations"]
+    state = session_state(session, sensation_colors, state_dtype(sensation_colors))
+    mesh.cell_data["face_colors"] = build_palette(sensation_colors)[state]
+    painted = state != 0
+else:
+    mesh = pv.read(session_file)
+    painted = None
 
 # Check if 'face_colors' data exists in mesh.cell_data
 if 'face_colors' in mesh.cell_data:
     # Assign the 'face_colors' to be used in visualization
     colors = mesh.cell_data['face_colors']
-    
+
     # Visualize the mesh with the cell colors, and hide the orientation axes
     mesh.plot(scalars=colors, rgb=True, show_axes=False)
 else:
@@ -22,47 +50,22 @@ if 'face_colors' in mesh.cell_data:
     # Retrieve the cell data to export
     cell_data = mesh.cell_data['face_colors']
 
-    # Access the faces and points array
-    faces = mesh.faces
-    n_faces = mesh.n_faces
-    points = mesh.points
-    offset = 0
-
-    # Prepare a list to store data
-    face_vertex_data = []
-
-    # Iterate through each face
-    for i in range(n_faces):
-        n_vertices = faces[offset]  # Number of vertices in this face
-        vertex_indices = faces[offset + 1 : offset + 1 + n_vertices]
-        
-        # Retrieve the coordinates for each vertex in the current face
-        vertex_coords = points[vertex_indices]
+    # Save the faces, their vertex coordinates and colors to a CSV file
+    csv_file = "face_data_with_vertex_coords.csv"
+    write_face_csv(mesh, cell_data, csv_file)
 
-        # Format the coordinates for CSV output as a string
-        vertex_coords_str = ["({}, {}, {})".format(x, y, z) for x, y, z in vertex_coords]
-        
-        color = cell_data[i]  # Get the color for this face
+    print(f"Face data with vertex coordinates and colors has been saved to {csv_file}")
 
-        # Append the vertex coordinates and color data to the list
-        face_vertex_data.append({
-            'Face_Index': i,
-            'Vertex_Coordinates': "; ".join(vertex_coords_str),
-            'Red': color[0],
-            'Green': color[1],
-            'Blue': color[2]
-        })
+    # Same data as typed arrays (points, face connectivity, colors), much faster to write and read
+    npz_file = "face_data.npz"
+    write_face_npz(mesh, cell_data, npz_file)
 
-        # Move to the next face's starting index in the array
-        offset += 1 + n_vertices
+    print(f"Face data arrays have been saved to {npz_file}")
 
-    # Convert the list to a pandas DataFrame
-    df = pd.DataFrame(face_vertex_data)
+    # Only the painted (non-gray) faces as an indexed mesh, for matlab_plotting.m
+    mat_file = "painted_faces.mat"
+    write_painted_faces(mesh, cell_data, mat_file, painted=painted)
 
-    # Save the DataFrame to a CSV file
-    csv_file = "face_data_with_vertex_coords.csv"
-    df.to_csv(csv_file, index=False)
-    
-    print(f"Face data with vertex coordinates and colors has been saved to {csv_file}")
+    print(f"Painted faces have been saved to {mat_file}")
 else:
-    print("No 'face_colors' found in cell_data.")
\ No newline at end of file
+    print("No 'face_colors' found in cell_data.")
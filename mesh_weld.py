@@ -0,0 +1,92 @@
+import numpy as np
+import pyvista as pv
+import vtk
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+from vtk.util.numpy_support import numpy_to_vtkIdTypeArray
+from face_export import face_arrays
+
+
+# Group points that lie within tolerance of each other (transitively).
+# Returns the new id of every old point; new ids follow first appearance.
+def weld_point_ids(points, tolerance):
+    n = len(points)
+    pairs = cKDTree(points).query_pairs(tolerance, output_type="ndarray")
+    graph = coo_matrix((np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    # Renumber the components in order of their first point
+    _, first = np.unique(labels, return_index=True)
+    order = np.empty(len(first), dtype=np.int64)
+    order[np.argsort(first)] = np.arange(len(first))
+    return order[labels]
+
+
+# Drop repeated consecutive corners of each face (a collapsed edge turns a
+# quad into a triangle) and faces left with fewer than three corners.
+# Returns new offsets, connectivity and the kept old face ids.
+def collapse_faces(offsets, connectivity):
+    sizes = np.diff(offsets)
+    face_ids = np.repeat(np.arange(len(sizes)), sizes)
+    previous = np.empty_like(connectivity)
+    previous[1:] = connectivity[:-1]
+    # Previous corner of the first corner is the face's last corner
+    previous[offsets[:-1]] = connectivity[offsets[1:] - 1]
+    keep_corner = connectivity != previous
+
+    new_sizes = np.bincount(face_ids[keep_corner], minlength=len(sizes))
+    keep_face = new_sizes >= 3
+    keep_corner &= keep_face[face_ids]
+
+    new_offsets = np.concatenate([[0], np.cumsum(new_sizes[keep_face])])
+    return new_offsets, connectivity[keep_corner], np.flatnonzero(keep_face)
+
+
+# Keep a subset of faces of an offsets/connectivity pair
+def select_faces(offsets, connectivity, face_ids):
+    sizes = np.diff(offsets)[face_ids]
+    new_offsets = np.concatenate([[0], np.cumsum(sizes)])
+    corners = np.repeat(offsets[face_ids] - new_offsets[:-1], sizes) + np.arange(new_offsets[-1])
+    return new_offsets, connectivity[corners]
+
+
+def polydata_from_arrays(points, offsets, connectivity):
+    id_dtype = np.int64 if vtk.vtkIdTypeArray().GetDataTypeSize() == 8 else np.int32
+    polys = vtk.vtkCellArray()
+    polys.SetData(
+        numpy_to_vtkIdTypeArray(np.ascontiguousarray(offsets, dtype=id_dtype), deep=True),
+        numpy_to_vtkIdTypeArray(np.ascontiguousarray(connectivity, dtype=id_dtype), deep=True),
+    )
+    mesh = pv.PolyData()
+    mesh.SetPoints(pv.vtk_points(np.asarray(points, dtype=np.float64), deep=True))
+    mesh.SetPolys(polys)
+    return mesh
+
+
+# Canonical mesh: coincident vertices (within tolerance) merged, collapsed and
+# zero-area faces removed, unused points dropped. Also returns old_to_new, the
+# new cell id of every original cell (-1 where the cell was removed), so data
+# painted on the original cells can be carried over.
+def weld_mesh(mesh, tolerance=1e-6, min_area=0.0):
+    points = np.asarray(mesh.points, dtype=np.float64)
+    offsets, connectivity = face_arrays(mesh)
+
+    point_ids = weld_point_ids(points, tolerance)
+    welded_points = np.empty((point_ids.max() + 1, 3)) if len(point_ids) else np.empty((0, 3))
+    welded_points[point_ids] = points
+
+    offsets, connectivity, kept = collapse_faces(offsets, point_ids[connectivity])
+    canonical = polydata_from_arrays(welded_points, offsets, connectivity)
+
+    areas = np.asarray(canonical.compute_cell_sizes(length=False, area=True, volume=False).cell_data["Area"])
+    nonzero = np.flatnonzero(areas > min_area)
+    offsets, connectivity = select_faces(offsets, connectivity, nonzero)
+    kept = kept[nonzero]
+
+    # Only keep points still used by a face
+    used, connectivity = np.unique(connectivity, return_inverse=True)
+    canonical = polydata_from_arrays(welded_points[used], offsets, connectivity.ravel())
+
+    old_to_new = np.full(mesh.n_cells, -1, dtype=np.int64)
+    old_to_new[kept] = np.arange(len(kept))
+    return canonical, old_to_new
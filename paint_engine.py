@@ -0,0 +1,176 @@
+import numpy as np
+import pyvista as pv
+from stroke_journal import StrokeJournal
+
+
+# One bit per sensation, in the order of the sensation_colors table
+def sensation_bits(sensation_colors):
+    return {sensation: 1 << i for i, sensation in enumerate(sensation_colors)}
+
+
+# The palette and the lookup table hold a row for every combination of
+# sensations (2**n rows), which caps how many sensations a table can have
+max_sensations = 12
+
+
+def check_sensation_count(sensation_colors):
+    if len(sensation_colors) > max_sensations:
+        raise ValueError(f"{len(sensation_colors)} sensations given, at most {max_sensations} are supported")
+
+
+def state_dtype(sensation_colors):
+    check_sensation_count(sensation_colors)
+    return np.uint8 if len(sensation_colors) <= 8 else np.uint16
+
+
+# 0/1 matrix of which sensation bits each state value has (one column per sensation)
+def state_bits(values, n_sensations):
+    return ((np.asarray(values, dtype=np.int64)[:, None] >> np.arange(n_sensations)) & 1).astype(np.float64)
+
+
+# Display color for every possible combination of sensation bits: the default
+# gray for unpainted cells, otherwise the mean of the sensation colors present
+def build_palette(sensation_colors, default_color=(0.8, 0.8, 0.8)):
+    check_sensation_count(sensation_colors)
+    table = np.asarray(list(sensation_colors.values()), dtype=np.float64).reshape(-1, 3)
+    masks = np.arange(1 << len(table))
+    present = (masks[:, None] >> np.arange(len(table))) & 1
+    counts = present.sum(axis=1, keepdims=True)
+    palette = present @ table / np.maximum(counts, 1)
+    palette[0] = default_color
+    return palette
+
+
+# Lookup table that maps each bitmask value straight to its palette entry
+def build_lookup_table(palette):
+    lookup_table = pv.LookupTable()
+    set_lookup_colors(lookup_table, palette)
+    return lookup_table
+
+
+def set_lookup_colors(lookup_table, palette):
+    alpha = np.ones((len(palette), 1))
+    lookup_table.values = np.round(np.hstack([palette, alpha]) * 255).astype(np.uint8)
+    lookup_table.scalar_range = (-0.5, len(palette) - 0.5)
+
+
+# Painting engine.
+# Each cell keeps a compact bitmask of the sensations painted on it. That
+# bitmask array is also what gets rendered: it is the mesh's active cell
+# scalars, mapped to colors through a lookup table built from the palette.
+# Painting writes the bits in place into the VTK array the mapper renders
+# from and only bumps its modified time, so nothing is copied per event and
+# the per-cell upload is one byte. Recoloring a sensation only rebuilds the
+# lookup table. Every state change goes through write(), which also feeds
+# the undo/redo journal and keeps the per-sensation area totals current.
+class PaintEngine:
+    def __init__(self, plotter, mesh, sensation_colors, default_color=(0.8, 0.8, 0.8), name="sensation_state",
+                 history_limit=2_000_000, areas=None, area_scale=1.0):
+        self.plotter = plotter
+        self.mesh = mesh
+        self.sensation_colors = sensation_colors
+        self.default_color = default_color
+
+        self.bits = sensation_bits(sensation_colors)
+        self.palette = build_palette(sensation_colors, default_color)
+        self.lookup_table = build_lookup_table(self.palette)
+
+        mesh.cell_data[name] = np.zeros(mesh.n_cells, dtype=state_dtype(sensation_colors))
+        self.state = mesh.cell_data[name]
+        self.vtk_state = mesh.GetCellData().GetArray(name)
+
+        # Undo history, capped at history_limit recorded cells
+        self.journal = StrokeJournal(max_cells=history_limit)
+
+        # Cell areas (computed once; area_scale converts mesh units² to cm²) and
+        # the painted area of every sensation, updated by each write's delta
+        if areas is None:
+            areas = mesh.compute_cell_sizes(length=False, area=True, volume=False).cell_data["Area"]
+        self.areas = np.asarray(areas, dtype=np.float64) * area_scale
+        self.sensation_areas = np.zeros(len(self.bits))
+        self.area_epsilon = 1e-9 * self.areas.min(initial=np.inf) if len(self.areas) else 0.0
+
+        # Called with the changed cell ids (None: all cells) after every state
+        # change, before the redraw (e.g. to update a readout)
+        self.on_change = []
+
+    def begin_stroke(self):
+        self.journal.begin()
+
+    def end_stroke(self):
+        self.journal.close()
+
+    # Add a sensation to cells and redraw once
+    def paint(self, cells, sensation, render=True):
+        if len(cells) == 0 or sensation not in self.bits:
+            return
+        bit = self.bits[sensation]
+        # Unique ids, so no cell's area is counted twice
+        cells = np.unique(cells)
+        cells = cells[(self.state[cells] & bit) == 0]
+        if cells.size == 0:
+            return
+        self.write(cells, self.state[cells] | bit, render)
+
+    # Set the state of cells in place, journaling their previous values
+    def write(self, cells, values, render=True, record=True):
+        previous = self.state[cells]
+        if record:
+            self.journal.record(cells, previous)
+        self.state[cells] = values
+        self.sensation_areas += self.areas[cells] @ (state_bits(values, len(self.bits)) - state_bits(previous, len(self.bits)))
+        # Adding and removing the same areas leaves rounding residue (e.g. -8.9e-16
+        # after paint + undo); totals that small are an empty sensation
+        self.sensation_areas[self.sensation_areas < self.area_epsilon] = 0.0
+        self.mark_modified(render, cells)
+
+    def undo(self, render=True):
+        entry = self.journal.pop(self.journal.undo_stack)
+        if entry is None:
+            return
+        cells, previous = entry
+        self.journal.push(self.journal.redo_stack, (cells, self.state[cells]))
+        self.write(cells, previous, render, record=False)
+
+    def redo(self, render=True):
+        entry = self.journal.pop(self.journal.redo_stack)
+        if entry is None:
+            return
+        cells, values = entry
+        self.journal.push(self.journal.undo_stack, (cells, self.state[cells]))
+        self.write(cells, values, render, record=False)
+
+    # Replace the whole state (e.g. from a saved session); starts a fresh history
+    def load_state(self, state, render=True):
+        self.state[:] = state
+        self.journal = StrokeJournal(max_cells=self.journal.max_cells)
+        self.sensation_areas = self.areas @ state_bits(self.state, len(self.bits))
+        self.mark_modified(render)
+
+    # Cell ids that carry a sensation
+    def cells_with(self, sensation):
+        return np.flatnonzero(self.state & self.bits[sensation])
+
+    # Painted area per sensation in cm²
+    def area_totals(self):
+        return {sensation: float(area) for sensation, area in zip(self.bits, self.sensation_areas)}
+
+    # RGB per cell, for saving and exporting (the view itself renders from the state)
+    def face_colors(self):
+        return self.palette[self.state]
+
+    def set_sensation_color(self, sensation, color, render=True):
+        self.sensation_colors[sensation] = color
+        self.palette = build_palette(self.sensation_colors, self.default_color)
+        set_lookup_colors(self.lookup_table, self.palette)
+        if render:
+            self.plotter.render()
+
+    # VTK has no per-range dirty flag, so the array is marked modified as a
+    # whole; the mapper re-reads it from the same buffer on the next render
+    def mark_modified(self, render=True, cells=None):
+        self.vtk_state.Modified()
+        for callback in self.on_change:
+            callback(cells)
+        if render:
+            self.plotter.render()
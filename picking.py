@@ -0,0 +1,125 @@
+import numpy as np
+import vtk
+from vtk.util.numpy_support import numpy_to_vtk, vtk_to_numpy
+
+
+# vtkCellPicker backed by a spatial locator built once at load time, so a
+# pick walks the locator instead of testing every cell. The picker only uses
+# a locator whose dataset is the mapper's input, and PyVista feeds the mapper
+# through its own algorithm, so the locator is built on that output.
+# With a locator the picker accepts any cell within tolerance of the ray, not
+# just the one the ray hits first, so the tolerance defaults to 0 there; the
+# plain picker keeps the apps' original 0.01.
+def build_cell_picker(actor, locator="static", tolerance=None):
+    picker = vtk.vtkCellPicker()
+    if tolerance is None:
+        tolerance = 0.01 if locator is None else 0.0
+    picker.SetTolerance(tolerance)
+    if locator is None:
+        return picker
+
+    if locator == "obb":
+        cell_locator = vtk.vtkOBBTree()
+    else:
+        cell_locator = vtk.vtkStaticCellLocator()
+    mapper = actor.GetMapper()
+    mapper.Update()
+    cell_locator.SetDataSet(mapper.GetInput())
+    cell_locator.BuildLocator()
+    picker.AddLocator(cell_locator)
+    return picker
+
+
+# Cell picking from a cached cell-ID image.
+# The mesh is rendered offscreen once per camera pose with every cell drawn in
+# a flat color that encodes its id (24 bits, so up to ~16M cells). A pick is
+# then just an index into that image, plus the matching depth value to get the
+# surface point. The cache is rebuilt only when the camera or the window size
+# changes; the painting apps lock the camera, so that is rare.
+#
+# Same Pick / GetCellId / GetPickPosition calls as vtkCellPicker, so it can be
+# dropped into the stroke pipeline in its place. Rendering is offscreen only,
+# which also works with Mesa software OpenGL on a headless machine.
+class CellIdPicker:
+    def __init__(self, mesh):
+        ids = np.arange(1, mesh.n_cells + 1, dtype=np.uint32)
+        id_colors = np.stack([ids & 0xFF, (ids >> 8) & 0xFF, (ids >> 16) & 0xFF], axis=1).astype(np.uint8)
+
+        id_mesh = vtk.vtkPolyData()
+        id_mesh.CopyStructure(mesh)
+        id_mesh.GetCellData().SetScalars(numpy_to_vtk(id_colors, deep=True))
+
+        mapper = vtk.vtkPolyDataMapper()
+        mapper.SetInputData(id_mesh)
+        mapper.SetScalarModeToUseCellData()
+        mapper.SetColorModeToDirectScalars()
+        mapper.ScalarVisibilityOn()
+
+        actor = vtk.vtkActor()
+        actor.SetMapper(mapper)
+        actor.GetProperty().LightingOff()
+        actor.GetProperty().SetInterpolationToFlat()
+
+        self.renderer = vtk.vtkRenderer()
+        self.renderer.SetBackground(0, 0, 0)
+        self.renderer.AddActor(actor)
+
+        self.render_window = vtk.vtkRenderWindow()
+        self.render_window.SetOffScreenRendering(1)
+        self.render_window.SetMultiSamples(0)
+        self.render_window.AddRenderer(self.renderer)
+
+        self.cache_key = None
+        self.id_image = None
+        self.depth_image = None
+
+        self.cell_id = -1
+        self.pick_position = (0.0, 0.0, 0.0)
+
+    # Re-render the id and depth images if the camera or window changed
+    def update(self, renderer):
+        camera = renderer.GetActiveCamera()
+        size = tuple(renderer.GetRenderWindow().GetSize())
+        viewport = renderer.GetViewport()
+        key = (camera.GetMTime(), size, viewport)
+        if key == self.cache_key:
+            return
+
+        self.renderer.SetActiveCamera(camera)
+        self.renderer.SetViewport(viewport)
+        self.render_window.SetSize(*size)
+        self.render_window.Render()
+
+        width, height = size
+        rgb = vtk.vtkUnsignedCharArray()
+        self.render_window.GetPixelData(0, 0, width - 1, height - 1, 0, rgb, 0)
+        rgb = vtk_to_numpy(rgb).reshape(height, width, 3).astype(np.int32)
+        self.id_image = (rgb[..., 0] | (rgb[..., 1] << 8) | (rgb[..., 2] << 16)) - 1
+
+        depth = vtk.vtkFloatArray()
+        self.render_window.GetZbufferData(0, 0, width - 1, height - 1, depth)
+        self.depth_image = vtk_to_numpy(depth).reshape(height, width).copy()
+
+        # Reading the camera MTime after rendering: the render may touch the camera
+        self.cache_key = (camera.GetMTime(), size, viewport)
+
+    def Pick(self, x, y, z, renderer):
+        self.update(renderer)
+        height, width = self.id_image.shape
+        if not (0 <= x < width and 0 <= y < height):
+            self.cell_id = -1
+            return 0
+
+        self.cell_id = int(self.id_image[y, x])
+        if self.cell_id >= 0:
+            self.renderer.SetDisplayPoint(x, y, float(self.depth_image[y, x]))
+            self.renderer.DisplayToWorld()
+            wx, wy, wz, w = self.renderer.GetWorldPoint()
+            self.pick_position = (wx / w, wy / w, wz / w)
+        return int(self.cell_id >= 0)
+
+    def GetCellId(self):
+        return self.cell_id
+
+    def GetPickPosition(self):
+        return self.pick_position
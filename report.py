@@ -0,0 +1,74 @@
+import numpy as np
+import pyvista as pv
+
+# Foot axes of the meshes in this repo: y points up the leg, z from heel to
+# toes. Which side is medial depends on whether a left or right foot is
+# loaded, see medial_direction.
+foot_up = (0.0, 1.0, 0.0)
+foot_forward = (0.0, 0.0, 1.0)
+
+# Standard views: (title, direction the camera looks from, which foot axis is up on screen)
+standard_views = [
+    ("Dorsal", "up", "forward"),
+    ("Plantar", "down", "forward"),
+    ("Medial", "medial", "up"),
+    ("Lateral", "lateral", "up"),
+]
+
+
+# The longest toes are on the medial side, so the toe tip sits medial of the
+# forefoot's midline. That decides left vs. right without being told.
+def medial_direction(centroids, up=foot_up, forward=foot_forward):
+    up = np.asarray(up, dtype=float)
+    forward = np.asarray(forward, dtype=float)
+    side = np.cross(up, forward)
+    u = centroids @ forward
+    s = centroids @ side
+    length = np.ptp(u)
+    forefoot = u > u.max() - 0.25 * length
+    tip = u > u.max() - 0.03 * length
+    midline = (s[forefoot].min() + s[forefoot].max()) / 2
+    return side if s[tip].mean() > midline else -side
+
+
+# Offscreen multi-view report.
+# One offscreen plotter with a subplot per standard view. Every subplot shows
+# the same mesh object with the same lookup table, so the geometry and the
+# sensation state are shared rather than loaded per view, and painting shows
+# up on the next render() without rebuilding anything. Works headless with
+# software OpenGL. The medial side is found from the mesh unless given.
+class ReportRenderer:
+    def __init__(self, mesh, lookup_table, scalars="sensation_state", views=standard_views,
+                 window_size=(1600, 1200), up=foot_up, forward=foot_forward, medial=None):
+        up = np.asarray(up, dtype=float)
+        forward = np.asarray(forward, dtype=float)
+        if medial is None:
+            medial = medial_direction(np.asarray(mesh.cell_centers().points), up, forward)
+        medial = np.asarray(medial, dtype=float)
+        directions = {"up": up, "down": -up, "forward": forward, "back": -forward, "medial": medial, "lateral": -medial}
+
+        n_cols = int(np.ceil(np.sqrt(len(views))))
+        n_rows = int(np.ceil(len(views) / n_cols))
+        self.plotter = pv.Plotter(off_screen=True, shape=(n_rows, n_cols), window_size=list(window_size), border=False)
+        self.plotter.set_background("white")
+
+        center = np.asarray(mesh.center)
+        distance = mesh.length
+        for i, (title, look_from, screen_up) in enumerate(views):
+            self.plotter.subplot(i // n_cols, i % n_cols)
+            self.plotter.add_mesh(mesh, scalars=scalars, cmap=lookup_table, show_scalar_bar=False)
+            self.plotter.add_text(title, position="upper_left", font_size=12, color="black")
+            self.plotter.camera_position = [
+                tuple(center + directions[look_from] * distance),
+                tuple(center),
+                tuple(directions[screen_up]),
+            ]
+            self.plotter.reset_camera()
+
+    # Composite RGB image of all views, from the current session state
+    def render(self):
+        self.plotter.render()
+        return self.plotter.screenshot(None, return_img=True)
+
+    def close(self):
+        self.plotter.close()
@@ -0,0 +1,61 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+import numpy as np
+from face_export import face_arrays
+
+session_version = 1
+
+
+# Content hash of a mesh's geometry (points and face connectivity).
+# Sessions store it so they can only be loaded back onto the same mesh.
+def mesh_fingerprint(mesh):
+    offsets, connectivity = face_arrays(mesh)
+    digest = hashlib.sha256()
+    for array in (np.asarray(mesh.points, dtype=np.float64), offsets, connectivity):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+# Compact session file: only the painted cell ids and their sensation bitmask,
+# plus the mesh fingerprint and metadata. Its size depends on how much was
+# painted, not on the mesh.
+def save_session(path, state, sensation_colors, mesh_hash, **metadata):
+    state = np.asarray(state)
+    cells = np.flatnonzero(state)
+    metadata = {
+        "version": session_version,
+        "mesh_hash": mesh_hash,
+        "n_cells": int(len(state)),
+        "sensations": {name: list(color) for name, color in sensation_colors.items()},
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        **metadata,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    np.savez(path, cells=cells.astype(np.int32), codes=state[cells], metadata=np.array(json.dumps(metadata)))
+
+
+# Load a session; with mesh_hash given, a session painted on another mesh is rejected
+def load_session(path, mesh_hash=None):
+    with np.load(path) as data:
+        metadata = json.loads(str(data["metadata"]))
+        session = {"cells": data["cells"], "codes": data["codes"], "metadata": metadata}
+    if mesh_hash is not None and metadata["mesh_hash"] != mesh_hash:
+        raise ValueError(f"Session {path} was painted on a different mesh ({metadata['mesh_hash'][:12]}..., expected {mesh_hash[:12]}...)")
+    return session
+
+
+# Full per-cell state array of a session, with the sensation bits renumbered
+# to the order of sensation_colors (sessions store their own sensation table)
+def session_state(session, sensation_colors, dtype=np.uint8):
+    saved = list(session["metadata"]["sensations"])
+    remap = np.zeros(1 << len(saved), dtype=dtype)
+    for i, name in enumerate(saved):
+        if name in sensation_colors:
+            has_bit = (np.arange(len(remap)) >> i) & 1
+            remap |= (has_bit << list(sensation_colors).index(name)).astype(dtype)
+
+    state = np.zeros(session["metadata"]["n_cells"], dtype=dtype)
+    state[session["cells"]] = remap[session["codes"]]
+    return state
@@ -0,0 +1,54 @@
+import numpy as np
+
+
+# Undo/redo history of painting strokes.
+# A stroke is stored as the ids of the cells it changed plus their values
+# before the stroke, so undoing costs as much as the stroke, not the mesh.
+# History is capped by the total number of recorded cells; the oldest strokes
+# are dropped first once the cap is reached.
+class StrokeJournal:
+    def __init__(self, max_cells=2_000_000):
+        self.max_cells = max_cells
+        self.undo_stack = []
+        self.redo_stack = []
+        self.n_cells = 0
+        self.open = None
+
+    def begin(self):
+        self.close()
+        self.open = []
+
+    # Remember the values cells had before they are written
+    def record(self, cells, previous):
+        if self.open is None:
+            self.open = []
+        self.open.append((np.array(cells), np.array(previous)))
+        # New paint makes the redo history stale
+        self.n_cells -= sum(len(c) for c, _ in self.redo_stack)
+        self.redo_stack.clear()
+
+    # Fold the chunks of the open stroke into one entry. A cell written twice
+    # in the same stroke keeps the value from before its first write.
+    def close(self):
+        chunks, self.open = self.open, None
+        if not chunks:
+            return
+        cells = np.concatenate([c for c, _ in chunks])
+        previous = np.concatenate([p for _, p in chunks])
+        cells, first = np.unique(cells, return_index=True)
+        self.push(self.undo_stack, (cells, previous[first]))
+
+    def push(self, stack, entry):
+        stack.append(entry)
+        self.n_cells += len(entry[0])
+        while self.n_cells > self.max_cells and len(self.undo_stack) + len(self.redo_stack) > 1:
+            oldest = self.undo_stack.pop(0) if self.undo_stack else self.redo_stack.pop(0)
+            self.n_cells -= len(oldest[0])
+
+    def pop(self, stack):
+        self.close()
+        if not stack:
+            return None
+        entry = stack.pop()
+        self.n_cells -= len(entry[0])
+        return entry
@@ -0,0 +1,87 @@
+import numpy as np
+
+
+# Frame-rate-capped stroke pipeline.
+# Mouse events only queue their screen position. A repeating VTK timer drains
+# the queue once per frame: every queued position is picked, the brush cells
+# are merged and painted as one batch with a single render (the painter skips
+# cells that already carry the sensation, so repeated hits cost nothing and
+# cells reverted by an undo can be painted again).
+# Consecutive hits are joined by a straight brush segment so fast drags do not
+# break up into dots.
+class StrokePipeline:
+    def __init__(self, plotter, picker, brush, painter, current_sensation, target_fps=60):
+        self.plotter = plotter
+        self.picker = picker
+        self.brush = brush
+        self.painter = painter
+        self.current_sensation = current_sensation
+        self.target_fps = target_fps
+
+        self.pending = []
+        self.stroke_sensation = None
+        self.last_hit = None
+
+        plotter.iren.add_observer("TimerEvent", self.on_timer)
+        self.timer_id = plotter.iren.create_timer(max(1, int(1000 / target_fps)))
+
+    def begin_stroke(self):
+        self.flush()
+        self.stroke_sensation = None
+        self.last_hit = None
+        self.painter.begin_stroke()
+
+    def end_stroke(self):
+        self.flush()
+        self.painter.end_stroke()
+
+    # Undo/redo whole strokes; pending events belong to the stroke being undone.
+    # Painting on afterwards starts from the next pick instead of bridging
+    # back to the last one.
+    def undo(self):
+        self.flush()
+        self.last_hit = None
+        self.painter.undo()
+
+    def redo(self):
+        self.flush()
+        self.last_hit = None
+        self.painter.redo()
+
+    # Called from the mouse observers, does no picking or rendering itself
+    def add_event(self, x, y):
+        self.pending.append((x, y))
+
+    def on_timer(self, *args):
+        self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        positions, self.pending = self.pending, []
+
+        sensation = self.current_sensation[0]
+        if sensation not in self.painter.sensation_colors:
+            return
+        if sensation != self.stroke_sensation:
+            self.stroke_sensation = sensation
+            self.last_hit = None
+
+        hits = []
+        for x, y in dict.fromkeys(positions):
+            self.picker.Pick(x, y, 0, self.plotter.renderer)
+            picked_cell_id = self.picker.GetCellId()
+            if picked_cell_id < 0:
+                # Left the foot: don't bridge the gap to where the cursor comes back
+                self.last_hit = None
+                continue
+            point = self.picker.GetPickPosition()
+            if self.last_hit is None:
+                hits.append(self.brush.cells_at(point, picked_cell_id))
+            else:
+                hits.append(self.brush.cells_along(self.last_hit, point))
+            self.last_hit = point
+        if not hits:
+            return
+
+        self.painter.paint(np.unique(np.concatenate(hits)), sensation)
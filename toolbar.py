@@ -0,0 +1,90 @@
+import numpy as np
+import pyvista as pv
+
+
+# Retained-mode toolbar.
+# The text actors are created once; a mode change only restyles them (label
+# case, bold, shadow). Clicks are routed through a table of button rectangles
+# that is rebuilt, together with the actor positions, when the window size
+# changes.
+class Toolbar:
+    def __init__(self, plotter, dist_from_edge=150, y_offset=10, spacing=40, width=None, height=25, font_size=16):
+        self.plotter = plotter
+        self.dist_from_edge = dist_from_edge
+        self.y_offset = y_offset
+        self.spacing = spacing
+        self.width = width if width is not None else dist_from_edge - 50
+        self.height = height
+        self.font_size = font_size
+
+        self.keys = []
+        self.labels = []
+        self.actions = []
+        self.actors = []
+        self.rects = np.zeros((0, 4))
+        self.layout_size = None
+        self.active = None
+
+        plotter.render_window.AddObserver("WindowResizeEvent", self.on_resize)
+
+    def add_button(self, key, label, color, action):
+        actor = self.plotter.add_text(
+            label,
+            position=(0, 0),
+            font_size=self.font_size,
+            color=color,
+            name=f"{key}_button",
+        )
+        self.keys.append(key)
+        self.labels.append(label)
+        self.actions.append(action)
+        self.actors.append(actor)
+        self.layout_size = None
+
+    # Stack the buttons down from the bottom right, like the old update_buttons
+    def layout(self):
+        window_width, window_height = self.plotter.window_size
+        x = window_width - self.dist_from_edge
+        ys = self.y_offset + np.arange(len(self.actors)) * self.spacing
+        for actor, y in zip(self.actors, ys):
+            actor.SetPosition(x, y)
+        self.rects = np.column_stack([
+            np.full(len(ys), x),
+            ys,
+            np.full(len(ys), x + self.width),
+            ys + self.height,
+        ])
+        self.layout_size = (window_width, window_height)
+
+    def on_resize(self, *args):
+        self.layout()
+
+    # Highlight the active button: upper-case, bold and with a shadow
+    def set_active(self, active):
+        if self.layout_size is None:
+            self.layout()
+        active = active.lower()
+        for key, label, actor in zip(self.keys, self.labels, self.actors):
+            highlight = key == active
+            if highlight == (key == self.active):
+                continue
+            text_property = actor.GetTextProperty()
+            actor.SetInput(label.upper() if highlight else label)
+            text_property.SetBold(highlight)
+            text_property.SetShadow(highlight)
+        self.active = active
+
+    # Run the action of the button under (x, y); returns True if one was hit
+    def handle_click(self, x, y):
+        if self.layout_size != tuple(self.plotter.window_size):
+            self.layout()
+        rects = self.rects
+        hit = np.flatnonzero((rects[:, 0] <= x) & (x <= rects[:, 2]) & (rects[:, 1] <= y) & (y <= rects[:, 3]))
+        if hit.size == 0:
+            return False
+        self.actions[hit[0]]()
+        return True
+
+    def set_color(self, key, color):
+        actor = self.actors[self.keys.index(key)]
+        actor.GetTextProperty().SetColor(pv.Color(color).float_rgb)